@@ -0,0 +1,48 @@
+"""Read files straight out of CI artifact tarballs.
+
+Artifacts come as tar.gz bundles holding build-log.txt next to dozens of
+JUnit XML files. Members are streamed out of the archive in one pass and
+handed to the parsers as file objects, nothing is extracted to disk.
+"""
+
+import os
+import sys
+import tarfile
+from fnmatch import fnmatchcase
+
+
+def matches(name, patterns):
+    """Whether a member path, or its file name, matches one of the globs."""
+    base = os.path.basename(name)
+    return any(fnmatchcase(name, p) or fnmatchcase(base, p) for p in patterns)
+
+
+def iter_members(path, patterns):
+    """Yield (member name, binary file object) of matching archive members.
+
+    The archive is read as a stream, gzip, bzip2 and xz alike, so members
+    come in archive order and each file object is only readable until the
+    next member is yielded. Exits if no member matches.
+    """
+    found = False
+    with tarfile.open(path, "r|*") as tar:
+        for member in tar:
+            if member.isfile() and matches(member.name, patterns):
+                found = True
+                yield member.name, tar.extractfile(member)
+    if not found:
+        sys.exit(f"No member of {path} matches {' '.join(patterns)}")
+
+
+def open_inputs(files, archive_path=None):
+    """Yield binary file objects of the input files.
+
+    With archive_path, files are globs of the archive members to read.
+    """
+    if archive_path:
+        for _, f in iter_members(archive_path, files):
+            yield f
+        return
+    for path in files:
+        with open(path, "rb") as f:
+            yield f
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+"""Benchmark the Ginkgo log parsers.
+
+Every entry point runs in a fresh interpreter so that its peak RSS is not
+hidden by an earlier run. Results can be stored as a baseline and later
+runs compared against it.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# name: (module, call parsing the log at `path`)
+ENTRY_POINTS = {
+    "parse_log all": ("parse_log", "parse_files(path, 'all')"),
+    "parse_log tests": ("parse_log", "parse_files(path, 'tests')"),
+    "parse_log validations": ("parse_log", "parse_files(path, 'validations')"),
+    "parse_tests": ("parse_tests", "parse_files(path)"),
+    "parse_validations": ("parse_validations", "parse_files(path)"),
+}
+RUNNER = """
+import json, resource, sys, time
+import {module}
+path = sys.argv[1]
+start = time.perf_counter()
+result = {module}.{call}
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"time": elapsed, "tests": len(result), "rss_kb": rss}}))
+"""
+
+
+def run_entry_point(name, path):
+    module, call = ENTRY_POINTS[name]
+    out = subprocess.run(
+        [sys.executable, "-c", RUNNER.format(module=module, call=call), path],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(out.stdout)
+
+
+def bench(path, names, repeat):
+    """Return {name: stats} keeping the fastest of `repeat` runs."""
+    size = os.path.getsize(path)
+    results = {}
+    for name in names:
+        runs = [run_entry_point(name, path) for _ in range(repeat)]
+        best = min(runs, key=lambda r: r["time"])
+        results[name] = {
+            "time": best["time"],
+            "mb_s": size / 1024 ** 2 / best["time"],
+            "tests_s": best["tests"] / best["time"],
+            "tests": best["tests"],
+            "rss_mb": max(r["rss_kb"] for r in runs) / 1024,
+        }
+    return results
+
+
+def print_table(results, baseline=None):
+    header = f"{'Entry point':<24}{'Time s':>10}{'MB/s':>10}{'Tests/s':>11}"
+    header += f"{'Tests':>8}{'RSS MB':>9}"
+    if baseline:
+        header += f"{'vs base':>10}"
+    print(header)
+    for name, r in results.items():
+        line = f"{name:<24}{r['time']:>10.3f}{r['mb_s']:>10.1f}{r['tests_s']:>11.0f}"
+        line += f"{r['tests']:>8}{r['rss_mb']:>9.1f}"
+        if baseline and name in baseline:
+            change = (baseline[name]["time"] - r["time"]) / baseline[name]["time"]
+            line += f"{change:>+10.0%}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure throughput and peak memory of the log parsers."
+    )
+    parser.add_argument(
+        "log",
+        help="Ginkgo log to parse, i.e. one made by gen_ginkgo_log.py.",
+    )
+    parser.add_argument(
+        "-e",
+        "--entry-point",
+        action="append",
+        choices=list(ENTRY_POINTS),
+        help="Entry point to benchmark, can be repeated. Default: all of them",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs of each entry point, the fastest counts. Default: %(default)s",
+    )
+    parser.add_argument(
+        "-b",
+        "--baseline",
+        help="JSON file with stored results to compare times against, "
+        "positive changes are speedups.",
+    )
+    parser.add_argument(
+        "-s",
+        "--save",
+        help="Store the results as JSON in this file to use as a baseline.",
+    )
+    args = parser.parse_args()
+
+    results = bench(args.log, args.entry_point or list(ENTRY_POINTS), args.repeat)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+"""Ingest the new builds of a Prow job into a results database.
+
+The job history is listed, builds already stored by results_db.py are
+skipped, and the rest are fetched and parsed by a bounded pool of worker
+threads, the work being mostly waiting for Prow. Builds still running or
+without an Artifacts link are not stored, so a later crawl retries them.
+"""
+
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from parse_log import parse_source
+import prow
+import results_db
+
+
+def new_builds(db, builds):
+    """Finished builds whose build ID isn't in the database yet."""
+    known = {row[0] for row in db.execute("SELECT build_id FROM runs")}
+    return [
+        build for build in builds
+        if build["id"] not in known and build["result"] != "PENDING"
+    ]
+
+
+def crawl(db, job, test_type="all", jobs=4, max_pages=1, prow_url=prow.PROW_URL):
+    """Parse and store the new builds of a job, return the failed builds."""
+    builds = prow.list_builds(prow.job_history_url(job, prow_url), max_pages)
+    todo = new_builds(db, builds)
+    print(f"{job}: {len(builds)} builds, {len(todo)} new", file=sys.stderr)
+    failed = []
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(parse_source, build["link"], test_type): build
+            for build in todo
+        }
+        for num, future in enumerate(as_completed(futures), 1):
+            build = futures[future]
+            _, result, error = future.result()
+            if error:
+                failed.append(build)
+                print(f"[{num}/{len(todo)}] {build['id']}: {error}", file=sys.stderr)
+                continue
+            # Writes stay in this thread, the connection isn't shared
+            results_db.ingest_run(
+                db, build["id"], result, build["link"], build["started"]
+            )
+            print(f"[{num}/{len(todo)}] {build['id']}", file=sys.stderr)
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fetch, parse and store new builds of Prow jobs."
+    )
+    parser.add_argument(
+        "jobs",
+        nargs="+",
+        help="Prow job names or URLs of their job history pages.",
+    )
+    parser.add_argument(
+        "--db",
+        default="results.db",
+        help="SQLite database of results_db.py. Default: %(default)s",
+    )
+    parser.add_argument(
+        "-t",
+        "--test-type",
+        default="all",
+        choices=["all", "validations", "tests"],
+        help="What to extract from logs. Default: %(default)s",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=4,
+        help="Builds fetched and parsed at once. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--pages",
+        type=int,
+        default=1,
+        help="Job history pages to read, newest first. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--prow-url",
+        default=prow.PROW_URL,
+        help="Prow to read job names from. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Seconds before a stalled Prow request is given up. Default: %s"
+        % prow.SETTINGS["timeout"],
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        help="Retries of failed Prow requests, with exponential backoff. "
+        "Default: %s" % prow.SETTINGS["retries"],
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Keep downloaded build logs in this directory and reuse them.",
+    )
+    args = parser.parse_args()
+    prow.configure(
+        timeout=args.timeout,
+        retries=args.retries,
+        cache_dir=args.cache_dir,
+        # Let every worker keep its connection
+        max_connections=max(args.workers, prow.SETTINGS["max_connections"]),
+    )
+
+    db = results_db.connect(args.db)
+    failed = []
+    for job in args.jobs:
+        failed += crawl(
+            db, job, args.test_type, args.workers, args.pages, args.prow_url
+        )
+    db.close()
+    if failed:
+        print(
+            f"{len(failed)} builds not ingested, they are retried next time",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
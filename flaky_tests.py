@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+"""Find flaky and degrading tests over many runs.
+
+Results of all runs are loaded into tests x runs NumPy arrays, oldest run
+first, and every metric is computed for all tests at once:
+
+- pass ratio: passed runs out of the runs that executed the test
+- flip rate: how often the outcome changed from one executed run to the next
+- failure streaks: longest and current run of consecutive failures
+- duration drift: change of the fitted duration over the window, relative
+  to the mean duration
+
+Skipped and missing results do not count as runs, nor break streaks.
+"""
+
+import argparse
+import glob
+import json
+import sys
+
+import numpy as np
+
+import history
+from results_db import connect, read_runs
+
+# Result codes in the matrix, 0 is a test missing from a run
+CODES = {"pass": 1, "fail": 2, "skip": 3, "error": 4}
+RESULT_CODES = """
+SELECT run_id, test_id, CASE result
+    WHEN 'pass' THEN 1 WHEN 'fail' THEN 2 WHEN 'skip' THEN 3 ELSE 4 END,
+    IFNULL(time, 0)
+FROM results
+"""
+RESULT_DTYPE = [("run", "i8"), ("test", "i8"), ("code", "i1"), ("time", "f8")]
+
+
+def load_files(paths):
+    """Return {run_id: {test: result}} of the files, in the given order.
+
+    A run is keyed by the build ID in its file or path, else by the file
+    path, as files of different runs tend to have the same name. Exits
+    when two runs get the same key instead of merging them.
+    """
+    runs = {}
+    for path in paths:
+        for run, tests in read_runs(path).items():
+            run = run or history.build_id(path) or path
+            if run in runs:
+                sys.exit(f"Run {run} of {path} was already read")
+            runs[run] = tests
+    return runs
+
+
+def load_db(path):
+    """Return test names, run IDs, codes and times stored by results_db.
+
+    The matrix is filled straight from the integer IDs of the database,
+    runs ordered by timestamp.
+    """
+    db = connect(path)
+    runs = db.execute("SELECT id, build_id FROM runs ORDER BY timestamp, id")
+    runs = runs.fetchall()
+    tests = db.execute("SELECT id, name FROM tests").fetchall()
+    if not runs or not tests:
+        db.close()
+        return build_matrix({build_id: {} for _, build_id in runs})
+    run_ids, build_ids = zip(*runs)
+    test_ids, names = zip(*tests)
+    # Straight from the cursor, without a list of a million tuples first
+    results = np.fromiter(db.execute(RESULT_CODES), dtype=RESULT_DTYPE)
+    db.close()
+    # Lookup tables from database IDs to matrix rows and columns
+    cols = np.zeros(max(run_ids) + 1, dtype=np.intp)
+    cols[list(run_ids)] = np.arange(len(run_ids))
+    rows = np.zeros(max(test_ids) + 1, dtype=np.intp)
+    rows[list(test_ids)] = np.arange(len(test_ids))
+    codes = np.zeros((len(names), len(run_ids)), dtype=np.int8)
+    times = np.full((len(names), len(run_ids)), np.nan)
+    row = rows[results["test"]]
+    col = cols[results["run"]]
+    codes[row, col] = results["code"]
+    times[row, col] = results["time"]
+    return list(names), list(build_ids), codes, times
+
+
+def build_matrix(runs):
+    """Return test names, run IDs and the (tests x runs) codes and times."""
+    names = {}
+    for tests in runs.values():
+        for name in tests:
+            names.setdefault(name, len(names))
+    codes = np.zeros((len(names), len(runs)), dtype=np.int8)
+    times = np.full((len(names), len(runs)), np.nan)
+    for col, tests in enumerate(runs.values()):
+        rows = [names[name] for name in tests]
+        codes[rows, col] = [
+            CODES.get(test["result"], CODES["error"]) for test in tests.values()
+        ]
+        times[rows, col] = [float(test["time"] or 0) for test in tests.values()]
+    return list(names), list(runs), codes, times
+
+
+def analyze(codes, times):
+    """Compute the metrics of every test, returning a dict of arrays."""
+    n_tests, n_runs = codes.shape
+    ran = (codes != 0) & (codes != CODES["skip"])
+    failed = ran & (codes != CODES["pass"])
+    executed = ran.sum(axis=1)
+    passed = (codes == CODES["pass"]).sum(axis=1)
+
+    # Column of the previous executed run of each test, -1 when none
+    cols = np.arange(n_runs)
+    last_ran = np.maximum.accumulate(np.where(ran, cols, -1), axis=1)
+    prev = np.full_like(last_ran, -1)
+    prev[:, 1:] = last_ran[:, :-1]
+    has_prev = ran & (prev >= 0)
+    prev_failed = np.take_along_axis(failed, np.maximum(prev, 0), axis=1)
+    flips = (has_prev & (failed != prev_failed)).sum(axis=1)
+    transitions = has_prev.sum(axis=1)
+
+    # Failures so far minus failures up to the last pass is the streak
+    fail_count = np.cumsum(failed, axis=1)
+    at_last_pass = np.maximum.accumulate(
+        np.where(ran & ~failed, fail_count, 0), axis=1
+    )
+    streak = fail_count - at_last_pass
+
+    # Least squares slope of duration over run index, executed runs only
+    weight = ran & ~np.isnan(times)
+    count = weight.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.where(weight, times, 0.0)
+        x_mean = (weight * cols).sum(axis=1) / count
+        t_mean = t.sum(axis=1) / count
+        dx = np.where(weight, cols - x_mean[:, None], 0.0)
+        slope = (dx * (t - t_mean[:, None])).sum(axis=1) / (dx ** 2).sum(axis=1)
+        drift = slope * (n_runs - 1) / t_mean
+        pass_ratio = passed / executed
+        flip_rate = flips / transitions
+    return {
+        "runs": executed,
+        "pass_ratio": np.nan_to_num(pass_ratio, nan=1.0),
+        "flip_rate": np.nan_to_num(flip_rate),
+        "longest_streak": streak.max(axis=1) if n_runs else np.zeros(n_tests),
+        "current_streak": streak[:, -1] if n_runs else np.zeros(n_tests),
+        "mean_time": np.nan_to_num(t_mean),
+        "drift": np.nan_to_num(drift, posinf=0.0, neginf=0.0),
+    }
+
+
+def top(metrics, key, n, min_runs):
+    """Indexes of the n tests with the highest metric, ignoring rare tests."""
+    values = np.where(metrics["runs"] >= min_runs, metrics[key], -np.inf)
+    order = np.argsort(-values, kind="stable")[:n]
+    return [i for i in order if values[i] > 0]
+
+
+def print_top(title, names, metrics, indexes):
+    print(f"\n{title}")
+    print(f"{'Flips':>7}{'Pass':>7}{'Streak':>8}{'Now':>5}{'Drift':>8}"
+          f"{'Mean s':>9}{'Runs':>6}  Test")
+    for i in indexes:
+        print(f"{metrics['flip_rate'][i]:>7.0%}{metrics['pass_ratio'][i]:>7.0%}"
+              f"{metrics['longest_streak'][i]:>8}{metrics['current_streak'][i]:>5}"
+              f"{metrics['drift'][i]:>+8.0%}{metrics['mean_time'][i]:>9.1f}"
+              f"{metrics['runs'][i]:>6}  {names[i]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Show the most flaky and degrading tests of many runs."
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help=(
+            "junit2json or parse_log JSON, JUnit XML or NDJSON files, "
+            "or globs of them. Runs are taken in the sorted order of the files."
+        ),
+    )
+    parser.add_argument(
+        "--db",
+        help="Read the runs from a results_db.py database instead, by timestamp.",
+    )
+    parser.add_argument(
+        "-n",
+        "--top",
+        type=int,
+        default=10,
+        help="Tests to show in each list. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--min-runs",
+        type=int,
+        default=5,
+        help="Ignore tests executed in fewer runs. Default: %(default)s",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Also write the metrics of every test to this JSON file.",
+    )
+    args = parser.parse_args()
+    if not args.files and not args.db:
+        parser.error("give files with results or --db")
+
+    if args.db:
+        names, run_ids, codes, times = load_db(args.db)
+    else:
+        paths = []
+        for pattern in args.files:
+            paths.extend(sorted(glob.glob(pattern)) or [pattern])
+        names, run_ids, codes, times = build_matrix(load_files(paths))
+    metrics = analyze(codes, times)
+
+    print(f"{len(names)} tests in {len(run_ids)} runs")
+    print_top(
+        "Most flaky tests", names, metrics,
+        top(metrics, "flip_rate", args.top, args.min_runs),
+    )
+    print_top(
+        "Most degrading tests (duration drift)", names, metrics,
+        top(metrics, "drift", args.top, args.min_runs),
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "runs": run_ids,
+                    "tests": {
+                        name: {k: v[i].item() for k, v in metrics.items()}
+                        for i, name in enumerate(names)
+                    },
+                },
+                f,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+"""Generate synthetic Ginkgo v1 build logs for benchmarking the log parsers.
+
+The logs follow the layout of cnf-tests build-log.txt: preamble noise, the
+validation suite, the setup suite and the integration tests suite, each
+spec between "------------------------------" separators and colored the
+way Ginkgo prints to a terminal.
+"""
+
+import argparse
+import random
+import re
+
+from ginkgo_log import SUITES
+
+GROUPS = ["operator", "integration", "Test Connectivity", "Platform Check"]
+CONTEXTS = ["Ingress", "Egress", "with the oslat image", "Generic", "when enabled"]
+NOISE = [
+    "I0216 14:11:09.090539   17636 request.go:601] Waited for {:.9f}s due to "
+    "client-side throttling, not priority and fairness, request: "
+    "GET:https://10.19.16.65:6443/api/v1/namespaces/cnf-{}/pods\n",
+    "\033[1mSTEP\033[0m: Waiting {:.3f}s for the \033[1m{}\033[0m pods to be "
+    "\033[32mRunning\033[0m\n",
+]
+SRC = "/tmp/cnf-hxK37/cnf-features-deploy/cnf-tests/testsuites/{}/{}.go:{}"
+
+
+def parse_size(size):
+    """Turn 500K, 100M or 2G into a number of bytes."""
+    found = re.fullmatch(r"(\d+)([KMG]?)", size.upper())
+    if not found:
+        raise argparse.ArgumentTypeError(f"Invalid size {size}")
+    return int(found.group(1)) * 1024 ** " KMG".index(found.group(2) or " ")
+
+
+def gray(text):
+    return f"\033[90m{text}\033[0m"
+
+
+def spec_lines(rnd, args, suite, title, text, validation=False):
+    """Return the lines of one spec and its (result, time)."""
+    roll = rnd.random()
+    if roll < args.fail_ratio:
+        result = "fail"
+    elif roll < args.fail_ratio + args.skip_ratio:
+        result = "skip"
+    else:
+        result = "pass"
+    time = round(rnd.expovariate(1 / 30), 3)
+    where = "validationsuite/cluster" if validation else f"e2esuite/{suite}"
+    src = SRC.format(where, suite, rnd.randint(10, 999))
+    top = "validation" if validation else f"[{suite}] {title}"
+    context = f"[{suite}]" if validation else rnd.choice(CONTEXTS)
+    lines = [
+        f"\033[0m{top}\033[0m {gray(context)} \n",
+        f"  \033[1m{text}\033[0m\n",
+        f"  \033[37m{src}\033[0m\n",
+    ]
+    if not validation:
+        lines.append(f"[BeforeEach] [{suite}] {title}\n")
+        lines.append(f"  {src}\n")
+    lines.append(f"[It] {text}\n")
+    lines.append(f"  {src}\n")
+    lines.extend(
+        rnd.choice(NOISE).format(rnd.uniform(1, 15), suite)
+        for _ in range(rnd.randint(0, args.noise))
+    )
+    lines.append("\n")
+    if result == "pass":
+        lines.append(f"\033[32m• [SLOW TEST:{time:.3f} seconds]\033[0m\n")
+    elif result == "fail":
+        lines.append(f"\033[91m\033[1m• Failure [{time:.3f} seconds]\033[0m\n")
+    else:
+        lines.append(f"\033[36m\033[1mS [SKIPPING] [{time:.3f} seconds]\033[0m\n")
+    lines += [
+        f"{top}\n",
+        f"{gray(src)}\n",
+        f"  {context}\n",
+        f"  {gray(src)}\n",
+        f"    {text}\n",
+        f"    {gray(src)}\n",
+    ]
+    if result == "fail":
+        lines += [
+            "\n",
+            "    \033[91mExpected\n",
+            "        <int32>: 1\n",
+            "    to equal\n",
+            "        <int32>: 0\033[0m\n",
+            "\n",
+            f"    {src}\n",
+        ]
+    return lines, result, time
+
+
+def write_suite(f, rnd, args, name, specs, validation=False, first=0):
+    """Write one Ginkgo suite with specs numbered from first on."""
+    header = f"Running Suite: CNF Features e2e {name}\n"
+    f.write(header + "=" * (len(header) - 1) + "\n")
+    f.write(f"Random Seed: \033[1m{rnd.randint(10 ** 9, 2 * 10 ** 9)}\033[0m\n")
+    f.write(f"Will run \033[1m{specs}\033[0m of \033[1m{specs}\033[0m specs\n\n")
+    counts = {"pass": 0, "fail": 0, "skip": 0}
+    total = 0
+    for num in range(first, first + specs):
+        suite = rnd.choice(SUITES)
+        title = rnd.choice(GROUPS)
+        text = f"should work in case {num}"
+        lines, result, time = spec_lines(rnd, args, suite, title, text, validation)
+        counts[result] += 1
+        total += time
+        f.write(gray("-" * 30) + "\n")
+        f.write("".join(lines))
+    f.write(gray("-" * 30) + "\n")
+    f.write(
+        f"\n\033[1m\033[91mRan {specs - counts['skip']} of {specs} Specs in "
+        f"{total + rnd.uniform(1, 60):.3f} seconds\033[0m\n"
+        f"\033[1m\033[91mFAIL!\033[0m -- \033[32m\033[1m{counts['pass']} Passed"
+        f"\033[0m | \033[91m\033[1m{counts['fail']} Failed\033[0m | "
+        f"\033[33m\033[1m0 Pending\033[0m | \033[36m\033[1m{counts['skip']} "
+        "Skipped\033[0m\n\n"
+    )
+
+
+def generate(args):
+    rnd = random.Random(args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write("************ telco5g cnf-tests commands ************\n")
+        for _ in range(50):
+            f.write(NOISE[0].format(rnd.uniform(1, 15), "setup"))
+        write_suite(f, rnd, args, "validation", args.validations, True)
+        write_suite(f, rnd, args, "setup", 2)
+        # Repeat the integration suite, with new spec names, until the log
+        # has the requested size
+        first = 0
+        while True:
+            write_suite(f, rnd, args, "integration tests", args.specs, first=first)
+            first += args.specs
+            if not args.size or f.tell() >= args.size:
+                break
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic Ginkgo v1 build log."
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="/tmp/synthetic-build-log.txt",
+        help="Output file. Default: %(default)s",
+    )
+    parser.add_argument(
+        "-n",
+        "--specs",
+        type=int,
+        default=250,
+        help="Specs in the integration tests suite. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--validations",
+        type=int,
+        default=20,
+        help="Specs in the validation suite. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--fail-ratio",
+        type=float,
+        default=0.1,
+        help="Share of failed specs. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--skip-ratio",
+        type=float,
+        default=0.5,
+        help="Share of skipped specs. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--noise",
+        type=int,
+        default=20,
+        help="Up to this many client and colored STEP lines inside each spec. "
+        "Default: %(default)s",
+    )
+    parser.add_argument(
+        "-s",
+        "--size",
+        type=parse_size,
+        help="Repeat the integration suite until the log reaches this size, "
+        "i.e. 100M or 2G.",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Random seed. Default: %(default)s"
+    )
+    args = parser.parse_args()
+    generate(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,872 @@
+"""Shared engine for parsing Ginkgo build logs and JSON reports.
+
+parse_log, parse_tests and parse_validations are front-ends over this
+module. Logs are streamed as bytes, in blocks of whole lines, into
+TestParser and ValidationParser, which split them into chunks at the
+Ginkgo separators and turn every chunk into a result. Results map test names to
+{"time": ..., "result": "pass" | "fail" | "skip" | "error"}, failed tests
+also get a "message" with the failure text and the output before it.
+Tests parsed from a log have the byte "offsets" [start, end] of their
+chunk, which read_slice turns back into the test output.
+"""
+
+import bz2
+import gzip
+import io
+import json
+import lzma
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# Logs are scanned as bytes, only test names get decoded, so stray binary
+# output mixed into a log can't break the parse.
+ansi = re.compile(rb"(\x9B|\x1B\[)[0-?]*[ -\/]*[@-~]")
+color_code_pattern = re.compile(rb"\033\[[0-9;]*m")
+ttime = re.compile(rb"([\d\.]+) seconds")
+spex_time = re.compile(rb"Ran \d+ of \d+ Specs in ([\d\.]+) seconds")
+validation_re = rb"^\W*(?:validation)?\W*(%s)\W"
+test_re = rb"^\W*(?:\[r[fe][fe]_id[^]]*\])?(?:\[test_id[^]]*\])?\W*(%s)\W"
+
+SEPARATOR = b"------------------------------"
+VALIDATION_SUITE = b"Running Suite: CNF Features e2e validation"
+SETUP_SUITE = b"Running Suite: CNF Features e2e setup"
+INTEGRATION_SUITE = b"Running Suite: CNF Features e2e integration tests"
+SECTIONS = {
+    "validation": VALIDATION_SUITE,
+    "setup": SETUP_SUITE,
+    "integration": INTEGRATION_SUITE,
+}
+# Lines that close a chunk
+TEST_MARKERS = (SEPARATOR,)
+VALIDATION_MARKERS = (SEPARATOR, VALIDATION_SUITE)
+# Found in the line with the result of a spec
+RESULT_MARKERS = ("•".encode(), b"S [SKIPPING]")
+TIME_CHARS = b"0123456789."
+# Bytes read at once, and the least handed to a worker in parallel parsing
+BLOCK_SIZE = 1024 * 1024
+MIN_RANGE = 4 * 1024 * 1024
+# Output lines kept before a failure, and the most bytes of a message, so
+# a test dumping megabytes still gets a short message
+CONTEXT_LINES = 20
+MESSAGE_SIZE = 4096
+# Output before a failure searched for those lines, in message sizes, as
+# color codes make the raw lines longer
+CONTEXT_WINDOW = 4
+# Bytes at the end of a log searched for the final suite summary
+TAIL_SIZE = 256 * 1024
+
+SUITES = [
+    "vrf",
+    "sctp",
+    "serial",
+    "sriov",
+    "gatekeeper",
+    "tuningcni",
+    "pao",
+    "metallb",
+    "xt_u32",
+    "sro",
+    "performance",
+    "ptp",
+    "bondcni",
+    "ovs_qos",
+    "s2i",
+    "dpdk",
+    "fec",
+    "multinetworkpolicy",
+]
+# Built once, a single search finds whichever suite a line belongs to
+suite_names = b"|".join(re.escape(t.encode()) for t in SUITES)
+suite_pattern = re.compile(suite_names)
+validation_pattern = re.compile(validation_re % suite_names)
+test_pattern = re.compile(test_re % suite_names)
+# Whole lines, the way iterating a binary file splits them
+line_pattern = re.compile(rb"[^\n]*\n|[^\n]+")
+result_marker = re.compile(b"|".join(re.escape(m) for m in RESULT_MARKERS))
+end_of_section = re.compile(b"%s|%s" % (SETUP_SUITE, INTEGRATION_SUITE))
+blank_line = re.compile(rb"\n[ \t]*\n")
+# Ginkgo v2 may add the reason, i.e. "FAIL! - Interrupted by User -- ..."
+summary_pattern = re.compile(
+    rb"Ran (\d+) of (\d+) Specs in ([\d\.]+) seconds\s*\n"
+    rb"(?:\s*(SUCCESS|FAIL)![^\n]*? -- (\d+) Passed \| (\d+) Failed"
+    rb"(?: \| (\d+) Flaked)? \| (\d+) Pending \| (\d+) Skipped)?"
+)
+SUMMARY_KEYS = (
+    "ran", "specs", "time", "status", "passed", "failed", "flaked", "pending",
+    "skipped",
+)
+
+
+def clean_line(line):
+    line = color_code_pattern.sub(b"", line.strip())
+    # line = line.strip('\n')
+    return line
+
+
+def get_time(x):
+    text = b"".join(x)
+    if b"seconds" not in text:
+        return "0"
+    # Same as ttime.search, but bytes.find skips ahead much faster than
+    # the regex engine trying every position
+    pos = text.find(b" seconds")
+    while pos != -1:
+        start = pos
+        while start and text[start - 1] in TIME_CHARS:
+            start -= 1
+        if start < pos:
+            return text[start:pos].decode()
+        pos = text.find(b" seconds", pos + 1)
+    return None
+
+
+def get_name(x, validation=False):
+    if not suite_pattern.search(b"".join(x)):
+        return None
+    name_pattern = validation_pattern if validation else test_pattern
+    name = b""
+    for ind, line in enumerate(x):
+        line = clean_line(line)
+        if name_pattern.search(line) or b"MetalLB" in line:
+            name = line
+            if len(x) > (ind + 1):
+                name += b" " + clean_line(x[ind + 1])
+            name = name.strip(b'"')
+            break
+    # name = ansi.sub('', name)
+    return name.decode("utf-8", errors="replace")
+
+
+def get_result(x):
+    # Only the first line with a result marker decides, find it in one go
+    text = color_code_pattern.sub(b"", b"".join(x))
+    found = result_marker.search(text)
+    if not found:
+        return "skip"
+    end = text.find(b"\n", found.end())
+    line = text[line_start(text, found.start()):None if end == -1 else end].strip()
+    if "• Failure ".encode() in line:
+        return "fail"
+    if b"S [SKIPPING]" in line:
+        return "skip"
+    return "pass"
+
+
+def get_message(chunk, lines=CONTEXT_LINES, size=MESSAGE_SIZE):
+    """Failure context of a failed chunk, at most size bytes of it.
+
+    The last lines of output before the "• Failure" marker come first,
+    then the failure text after the spec description, which ends with the
+    location of the failure. Beyond size, the start of the context is cut.
+    Only the end of the output, CONTEXT_WINDOW times size bytes before the
+    marker, is looked at, however much a test printed.
+    """
+    # bytes.find skips to a marker at C speed, the regex tries every byte
+    found = [p for p in (chunk.find(m) for m in RESULT_MARKERS) if p != -1]
+    if not found:
+        return None
+    start = line_start(chunk, min(found))
+    window = max(0, start - CONTEXT_WINDOW * size)
+    before = chunk[window:start]
+    if window:
+        # Drop the line cut by the window, it can't fit in size anyway
+        before = before[before.find(b"\n") + 1:]
+    # Split from the end, so only the kept lines are looked at
+    before = color_code_pattern.sub(b"", before)
+    context = before.rstrip().rsplit(b"\n", lines)[-lines:]
+    end = chunk.find(b"\n", min(found))
+    failure = b""
+    if end != -1:
+        # Below the marker the spec description ends with a blank line
+        text = color_code_pattern.sub(b"", chunk[end:])
+        blank = blank_line.search(text)
+        if blank:
+            failure = text[blank.end():].strip(b"\n")
+    message = b"\n".join(context).strip(b"\n") + b"\n\n" + failure
+    return cap_message(message, size)
+
+
+def cap_message(message, size):
+    """Decode at most the last size bytes of message, from a line start."""
+    if len(message) > size:
+        message = message[-size:]
+        message = message[message.find(b"\n") + 1:]
+    return message.decode("utf-8", errors="replace")
+
+
+def spex_found(x):
+    return spex_time.search(b"\n".join(x))
+
+
+def update_spex(r, total_time):
+    cycle_time = r["total_cycle_time"]
+    del r["total_cycle_time"]
+    leftover = total_time - cycle_time
+    fails = {k: v for k, v in r.items() if v["result"] == "fail"}
+    if not fails:
+        return r
+    time_add = leftover / len(fails)
+    for k, _ in fails.items():
+        r[k]["time"] += time_add
+    return r
+
+
+def line_start(data, pos):
+    return data.rfind(b"\n", 0, pos) + 1
+
+
+def split_chunks(markers, pieces, data):
+    """Split data at the lines holding one of the markers.
+
+    ``pieces`` is the unfinished chunk from earlier data, as a list of
+    bytes. Return the chunks completed by a marker line, as (chunk, end)
+    with end the offset of the marker line in data, and the pieces of the
+    unfinished rest. A chunk spanning many blocks is joined only once it
+    is complete, so its size doesn't make building it quadratic. Markers
+    are found with bytes.find, at C speed instead of looking at every line.
+    """
+    chunks = []
+    start = 0
+    found = [data.find(marker) for marker in markers]
+    while True:
+        pos = min((p for p in found if p != -1), default=-1)
+        if pos == -1:
+            break
+        end = line_start(data, pos)
+        pieces.append(data[start:end])
+        chunks.append((b"".join(pieces), end))
+        pieces = []
+        end = data.find(b"\n", pos)
+        start = len(data) if end == -1 else end + 1
+        found = [
+            data.find(marker, start) if -1 < p < start else p
+            for marker, p in zip(markers, found)
+        ]
+    if start < len(data):
+        pieces.append(data[start:])
+    return chunks, pieces
+
+
+def chunk_lines(chunk):
+    """Lines of a chunk, without the ones keep_line drops."""
+    return [line for line in line_pattern.findall(chunk) if keep_line(line)]
+
+
+def chunk_record(chunk, validation=False, end=None):
+    """Parse one chunk into (name, time, result, spex, message, offsets).
+
+    spex is the duration of the whole suite when the chunk holds the
+    "Ran N of M Specs" summary of the validations, otherwise None. message
+    is only set for failed tests. offsets are the start and end of the
+    chunk in the log, given the end. Parsers apply records in log order,
+    which is all that depends on order.
+    """
+    z = chunk_lines(chunk)
+    name = get_name(z, validation)
+    time = test_result = spex = message = None
+    if name:
+        time = get_time(z)
+        test_result = get_result(z)
+        if test_result == "fail":
+            message = get_message(chunk)
+    if validation:
+        found = spex_found(z)
+        if found:
+            spex = float(found.group(1))
+    offsets = None
+    if end is not None:
+        offsets = [end - len(chunk), end]
+    return name, time, test_result, spex, message, offsets
+
+
+def make_result(time, test_result, message=None, offsets=None):
+    result = {"time": time, "result": test_result}
+    if message is not None:
+        result["message"] = message
+    if offsets is not None:
+        result["offsets"] = offsets
+    return result
+
+
+class TestParser:
+    """Collect integration test results from a Ginkgo log.
+
+    Data is fed in blocks of whole lines, or line by line. Every chunk is
+    parsed as soon as its closing separator is seen, so the log is never
+    held in memory.
+    """
+
+    def __init__(self):
+        self.res = {}
+        # Pieces of the unfinished chunk
+        self.chunk = []
+        self.started = False
+        self.done = False
+        # Log offset of the next byte fed
+        self.pos = 0
+
+    def feed(self, data):
+        base = self.pos
+        self.pos += len(data)
+        if not self.started:
+            pos = data.find(INTEGRATION_SUITE)
+            if pos == -1:
+                return
+            self.started = True
+            start = line_start(data, pos)
+            data = data[start:]
+            base += start
+        chunks, self.chunk = split_chunks(TEST_MARKERS, self.chunk, data)
+        for chunk, end in chunks:
+            self.add_chunk(chunk, base + end)
+
+    def add_chunk(self, chunk, end=None):
+        self.apply(chunk_record(chunk, end=end))
+
+    def apply(self, record):
+        name, time, test_result, _, message, offsets = record
+        if name:
+            self.res[name] = make_result(time, test_result, message, offsets)
+
+    def result(self):
+        return self.res
+
+
+class ValidationParser:
+    """Collect validation results from a Ginkgo log.
+
+    The section starts at the first separator after the validation suite
+    header and ends at the setup or integration suite header.
+    """
+
+    def __init__(self):
+        self.res = {"total_cycle_time": 0}
+        # Pieces of the unfinished chunk
+        self.chunk = []
+        # One of "wait", "suite", "collect", "done"
+        self.state = "wait"
+        # Log offset of the next byte fed
+        self.pos = 0
+
+    def feed(self, data):
+        if self.state == "done":
+            return
+        base = self.pos
+        self.pos += len(data)
+        end = end_of_section.search(data)
+        if end:
+            data = data[:line_start(data, end.start())]
+        if self.state == "wait":
+            pos = data.find(VALIDATION_SUITE)
+            if pos != -1:
+                self.state = "suite"
+                start = line_start(data, pos)
+                data = data[start:]
+                base += start
+        if self.state == "suite":
+            pos = data.find(SEPARATOR)
+            if pos != -1:
+                self.state = "collect"
+                start = line_start(data, pos)
+                data = data[start:]
+                base += start
+        if self.state == "collect":
+            chunks, self.chunk = split_chunks(
+                VALIDATION_MARKERS, self.chunk, data
+            )
+            for chunk, chunk_end in chunks:
+                self.add_chunk(chunk, base + chunk_end)
+        if end:
+            self.state = "done"
+
+    def add_chunk(self, chunk, end=None):
+        self.apply(chunk_record(chunk, validation=True, end=end))
+
+    def apply(self, record):
+        res = self.res
+        name, time, test_result, spex, message, offsets = record
+        if name:
+            time = float(time)
+            full_test_time = time
+            if name in res:
+                full_test_time += res[name]["time"]
+            # Offsets and message are those of the last run
+            res[name] = make_result(full_test_time, test_result, message, offsets)
+            res["total_cycle_time"] += time
+        if spex is not None:
+            self.res = update_spex(res, spex)
+            self.res["total_cycle_time"] = 0
+
+    @property
+    def done(self):
+        return self.state == "done"
+
+    def result(self):
+        return {k: v for k, v in self.res.items() if k != "total_cycle_time"}
+
+
+def keep_line(line):
+    return (b"/tmp" not in line
+            and b"[BeforeEach]" not in line
+            and b"[It]" not in line)
+
+
+def feed_file(fpath, *parsers, offset=0, block_size=BLOCK_SIZE):
+    """Read the log once, handing blocks of whole lines to each parser.
+
+    Reading starts at byte ``offset`` and stops early once every parser
+    has seen the end of its section.
+    """
+    for parser in parsers:
+        parser.pos = offset
+    with open_log(fpath, offset) as f:
+        feed_stream(f, *parsers, block_size=block_size)
+
+
+def feed_stream(f, *parsers, block_size=BLOCK_SIZE):
+    """Hand blocks of whole lines of a binary file object to each parser."""
+    while True:
+        # Finish the last line so no line is split between blocks
+        block = f.read(block_size)
+        if not block:
+            break
+        block += f.readline()
+        for parser in parsers:
+            parser.feed(block)
+        if all(parser.done for parser in parsers):
+            break
+
+
+def build_index(fpath):
+    """Find byte offsets of the suite header lines with mmap."""
+    index = dict.fromkeys(SECTIONS)
+    with open(fpath, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return index
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for key, marker in SECTIONS.items():
+                pos = mm.find(marker)
+                if pos != -1:
+                    index[key] = mm.rfind(b"\n", 0, pos) + 1
+    return index
+
+
+def load_index(fpath):
+    """Return the section index of a log, using a sidecar file as cache.
+
+    The sidecar is rebuilt whenever the log size or mtime changes. A log in
+    a read-only directory still gets an index, it is just not saved.
+    """
+    stat = os.stat(fpath)
+    idx_path = fpath + ".sections.json"
+    try:
+        with open(idx_path) as f:
+            cached = json.load(f)
+        if cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime_ns:
+            return cached["sections"]
+    except (OSError, ValueError, KeyError):
+        pass
+    index = build_index(fpath)
+    try:
+        with open(idx_path, "w") as f:
+            json.dump(
+                {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sections": index},
+                f,
+            )
+    except OSError:
+        pass
+    return index
+
+
+def parse_test_data(fpath, index=None):
+    parser = TestParser()
+    if index is None:
+        feed_file(fpath, parser)
+    elif index["integration"] is not None:
+        feed_file(fpath, parser, offset=index["integration"])
+    return parser.result()
+
+
+def parse_validation_data(fpath, index=None):
+    parser = ValidationParser()
+    if index is None:
+        feed_file(fpath, parser)
+    elif index["validation"] is not None:
+        ends = [i for i in (index["setup"], index["integration"]) if i is not None]
+        # The section is empty when setup or integration run first
+        if not ends or min(ends) > index["validation"]:
+            feed_file(fpath, parser, offset=index["validation"])
+    return parser.result()
+
+
+def parse_all_data(fpath, index=None):
+    if index is not None:
+        # Both sections are reached by seeking, so reading them one after
+        # another still touches every byte at most once.
+        res = parse_validation_data(fpath, index)
+        res.update(parse_test_data(fpath, index))
+        return res
+    parsers = make_parsers("all")
+    feed_file(fpath, *parsers)
+    return merge_results(parsers)
+
+
+def parse_stream(f, test_type="all"):
+    """Parse a log read from a binary file object, i.e. an archive member."""
+    parsers = make_parsers(test_type)
+    feed_stream(f, *parsers)
+    return merge_results(parsers)
+
+
+def range_records(fpath, start, end, validation=False, last=True):
+    """Records of the chunks between byte offsets start and end of a log.
+
+    The range starts at a chunk boundary. Unless it is the last range of
+    its section, the next range starts with a separator line, which
+    completes the chunk still open at end.
+    """
+    markers = VALIDATION_MARKERS if validation else TEST_MARKERS
+    records = []
+    chunk = []
+    with open(fpath, "rb") as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            block = f.read(min(BLOCK_SIZE, end - pos))
+            # end is at a line start, so finishing the line never passes it
+            if pos + len(block) < end:
+                block += f.readline()
+            chunks, chunk = split_chunks(markers, chunk, block)
+            records.extend(
+                chunk_record(c, validation, pos + c_end) for c, c_end in chunks
+            )
+            pos += len(block)
+    if not last:
+        records.append(chunk_record(b"".join(chunk), validation, end))
+    # Only records with a test or a suite summary change results
+    return [r for r in records if r[0] or r[3] is not None]
+
+
+def split_ranges(fpath, start, end, count):
+    """Cut start to end into up to count ranges at separator lines."""
+    bounds = [start]
+    with open(fpath, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for num in range(1, count):
+                pos = mm.find(SEPARATOR, start + (end - start) * num // count, end)
+                if pos == -1:
+                    break
+                bound = mm.rfind(b"\n", 0, pos) + 1
+                if bound > bounds[-1]:
+                    bounds.append(bound)
+    bounds.append(end)
+    return list(zip(bounds, bounds[1:]))
+
+
+def parse_parallel(fpath, test_type="all", workers=None, index=None):
+    """Parse a plain log in worker processes, split at spec separators.
+
+    Each section is cut into byte ranges that start at separator lines.
+    Workers turn the chunks of their range into records, which are then
+    applied to a parser in log order, so repeated validations add up and
+    the suite leftover time is spread the same as in a sequential parse.
+    """
+    workers = workers or os.cpu_count()
+    index = index or build_index(fpath)
+    size = os.path.getsize(fpath)
+    sections = []
+    if test_type in ("all", "validations") and index["validation"] is not None:
+        ends = [i for i in (index["setup"], index["integration"]) if i is not None]
+        end = min(ends) if ends else size
+        # Validations are collected from the first separator on
+        start = None
+        if end > index["validation"]:
+            with open(fpath, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    pos = mm.find(SEPARATOR, index["validation"], end)
+                    if pos != -1:
+                        start = mm.rfind(b"\n", 0, pos) + 1
+        if start is not None:
+            sections.append((ValidationParser(), start, end))
+    if test_type in ("all", "tests") and index["integration"] is not None:
+        sections.append((TestParser(), index["integration"], size))
+    # More ranges than workers evens out ranges that parse slower
+    count = max(1, min(workers * 4, size // MIN_RANGE))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = []
+        for parser, start, end in sections:
+            validation = isinstance(parser, ValidationParser)
+            ranges = split_ranges(fpath, start, end, count)
+            futures = [
+                pool.submit(
+                    range_records, fpath, a, b, validation, b == ranges[-1][1]
+                )
+                for a, b in ranges
+            ]
+            jobs.append((parser, futures))
+        for parser, futures in jobs:
+            for future in futures:
+                for record in future.result():
+                    parser.apply(record)
+    return merge_results([parser for parser, _, _ in sections])
+
+
+def read_slice(fpath, start, end):
+    """Return bytes start to end of a log, i.e. the "offsets" of a test.
+
+    Plain logs are read with one seek, compressed ones have to be
+    decompressed up to start.
+    """
+    with open_log(fpath, start) as f:
+        return f.read(end - start)
+
+
+def read_tail(fpath, size=TAIL_SIZE):
+    """Return the last size bytes of a log.
+
+    Plain logs are read with one seek from the end. Compressed logs have no
+    way to get there but decompressing them, only the tail is kept.
+    """
+    if detect_compression(fpath) is None:
+        with open(fpath, "rb") as f:
+            f.seek(max(0, os.fstat(f.fileno()).st_size - size))
+            return f.read()
+    tail = b""
+    with open_log(fpath) as f:
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                return tail
+            tail = (tail + block)[-size:]
+
+
+def parse_summary(data):
+    """Return the last Ginkgo suite summary in data, or None.
+
+    The summary holds the "Ran N of M Specs in X seconds" numbers and,
+    when the line after it was found too, the status and counts of specs.
+    """
+    found = None
+    for found in summary_pattern.finditer(color_code_pattern.sub(b"", data)):
+        pass
+    if not found:
+        return None
+    summary = dict(zip(SUMMARY_KEYS, found.groups()))
+    for key, value in summary.items():
+        if value is not None:
+            summary[key] = value.decode()
+            if key != "status":
+                summary[key] = (float if key == "time" else int)(summary[key])
+    return summary
+
+
+def make_parsers(test_type):
+    if test_type == "validations":
+        return [ValidationParser()]
+    if test_type == "tests":
+        return [TestParser()]
+    return [ValidationParser(), TestParser()]
+
+
+def merge_results(parsers):
+    res = {}
+    for parser in parsers:
+        res.update(parser.result())
+    return res
+
+
+# Leading bytes of each supported compressed format
+MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bzip2",
+    b"\xfd7zXZ\x00": "xz",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+
+
+def detect_compression(fpath):
+    """Return the compression of a file from its magic bytes, or None."""
+    with open(fpath, "rb") as f:
+        head = f.read(6)
+    for magic, name in MAGIC.items():
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def open_zstd(fpath):
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(
+            f"{fpath} is zstd compressed, install the zstandard package to read it"
+        )
+    reader = zstandard.ZstdDecompressor().stream_reader(open(fpath, "rb"))
+    # The reader has no readline, buffering adds line iteration
+    return io.BufferedReader(reader)
+
+
+OPENERS = {
+    "gzip": gzip.open,
+    "bzip2": bz2.open,
+    "xz": lzma.open,
+    "zstd": open_zstd,
+}
+
+
+def open_log(fpath, offset=0):
+    """Open a log for reading bytes, decompressing it on the fly if needed.
+
+    ``offset`` is a byte position in the uncompressed log. Compressed logs
+    can only get there by decompressing everything before it.
+    """
+    compression = detect_compression(fpath)
+    if compression is None:
+        raw = open(fpath, "rb")
+        raw.seek(offset)
+        return raw
+    raw = OPENERS[compression](fpath)
+    # Not every decompressing stream can seek, zstd's can't, so read up to
+    # offset and drop it
+    while offset > 0:
+        block = raw.read(min(BLOCK_SIZE, offset))
+        if not block:
+            break
+        offset -= len(block)
+    return raw
+
+
+# Suites of a Ginkgo JSON report and the --test-type they belong to
+REPORT_SUITES = {
+    "CNF Features e2e validation": "validations",
+    "CNF Features e2e integration tests": "tests",
+}
+# Ginkgo spec states, grouped the way its JUnit reporter does
+REPORT_STATES = {
+    "passed": "pass",
+    "skipped": "skip",
+    "pending": "skip",
+    "failed": "fail",
+    "timedout": "fail",
+    "panicked": "error",
+    "interrupted": "error",
+    "aborted": "error",
+}
+SPEC_KEYS = ("LeafNodeType", "LeafNodeText", "State", "RunTime")
+FAILURE_KEYS = ("Message", "Location.FileName", "Location.LineNumber")
+
+
+def find_json_report(fpath):
+    """Return the Ginkgo JSON report saved next to a log, if there is one.
+
+    For build-log.txt that is build-log.report.json.
+    """
+    report = os.path.splitext(fpath)[0] + ".report.json"
+    if os.path.isfile(report):
+        return report
+    return None
+
+
+def iter_specs(f):
+    """Yield (suite description, spec) for every spec of a Ginkgo JSON report.
+
+    With ijson installed the report is streamed and only the fields used
+    here are kept, so captured spec output never piles up in memory.
+    Otherwise the whole report is loaded with json.
+    """
+    try:
+        import ijson
+    except ImportError:
+        for suite in json.load(f):
+            for spec in suite.get("SpecReports") or []:
+                yield suite.get("SuiteDescription"), spec
+        return
+    suite = None
+    spec = None
+    for prefix, event, value in ijson.parse(f):
+        if prefix == "item.SuiteDescription":
+            suite = value
+        elif prefix == "item.SpecReports.item":
+            if event == "start_map":
+                spec = {"ContainerHierarchyTexts": []}
+            elif event == "end_map":
+                yield suite, spec
+        elif prefix == "item.SpecReports.item.ContainerHierarchyTexts.item":
+            spec["ContainerHierarchyTexts"].append(value)
+        elif prefix.startswith("item.SpecReports.item.Failure."):
+            key = prefix[len("item.SpecReports.item.Failure."):]
+            if key in FAILURE_KEYS:
+                failure = spec.setdefault("Failure", {"Location": {}})
+                if key == "Message":
+                    failure[key] = value
+                else:
+                    failure["Location"][key[len("Location."):]] = value
+        elif prefix.startswith("item.SpecReports.item."):
+            key = prefix[len("item.SpecReports.item."):]
+            if key in SPEC_KEYS:
+                spec[key] = value
+
+
+def report_message(failure, size=MESSAGE_SIZE):
+    """Failure message and location of a report spec, like get_message."""
+    location = failure.get("Location") or {}
+    message = failure.get("Message", "")
+    if location.get("FileName"):
+        message += "\n\n%s:%s" % (location["FileName"], location.get("LineNumber"))
+    return cap_message(message.encode(), size)
+
+
+def parse_json_report(fpath, test_type="all"):
+    """Build the {name: {time, result[, message]}} results of a Ginkgo JSON report.
+
+    Names are the container texts and the It text joined by spaces, which
+    is how the log parsers name tests. Like the log parser, repeated
+    validations add up their time.
+    """
+    res = {}
+    with open(fpath, "rb") as f:
+        for suite, spec in iter_specs(f):
+            suite_type = REPORT_SUITES.get(suite)
+            if suite_type is None or test_type not in ("all", suite_type):
+                continue
+            if spec.get("LeafNodeType") != "It":
+                continue
+            name = " ".join(
+                spec.get("ContainerHierarchyTexts", []) + [spec["LeafNodeText"]]
+            )
+            time = float(spec.get("RunTime", 0)) / 1e9
+            if suite_type == "validations" and name in res:
+                time += res[name]["time"]
+            result = REPORT_STATES.get(spec.get("State"), "error")
+            message = None
+            if result == "fail":
+                message = report_message(spec.get("Failure") or {})
+            res[name] = make_result(time, result, message)
+    return res
+
+
+def parse_files(path, test_type="all", index=False, report=None, workers=None):
+    """Parse a log, or the Ginkgo JSON report next to it, into results.
+
+    test_type is "all", "validations" or "tests". With index, plain logs
+    keep a section index and seek straight to the suites they need. With
+    more than one of workers, plain logs are parsed in parallel.
+    """
+    report = report or find_json_report(path)
+    if report:
+        return parse_json_report(report, test_type)
+    # Offsets into compressed data are useless for seeking, so those logs
+    # are always read from the start.
+    plain = detect_compression(path) is None
+    sections = load_index(path) if index and plain else None
+    if workers and workers > 1 and plain:
+        return parse_parallel(path, test_type, workers, sections)
+    if test_type == "validations":
+        file_data = parse_validation_data(path, sections)
+    elif test_type == "tests":
+        file_data = parse_test_data(path, sections)
+    elif test_type == "all":
+        file_data = parse_all_data(path, sections)
+    return file_data
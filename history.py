@@ -0,0 +1,114 @@
+"""Test results as rows of a run history table.
+
+Besides the JSON dict of one run, results can be written as rows with the
+columns below: newline-delimited JSON, which is appended to so one file
+collects many runs, or Parquet, which loads thousands of runs into a
+single table in one read.
+"""
+
+import json
+import re
+import sys
+
+from ginkgo_log import SUITES
+
+COLUMNS = ["run_id", "test", "suite", "result", "time"]
+FORMATS = ["json", "ndjson", "parquet"]
+suite_pattern = re.compile("|".join(re.escape(t) for t in SUITES))
+build_id_pattern = re.compile(r"[0-9]+")
+
+
+def build_id(source):
+    """Prow build ID in a job URL or artifacts path, or None.
+
+    Only the Prow layout is trusted, other numbers in a path, like a year,
+    are no build IDs: the directory holding artifacts/, the directory two
+    below logs/, i.e. logs/<job>/<build ID>, or the end of a /view/ URL.
+    """
+    parts = source.strip("/").split("/")
+    found = [
+        parts[i - 1] for i, part in enumerate(parts) if part == "artifacts" and i
+    ]
+    found += [
+        parts[i + 2] for i, part in enumerate(parts)
+        if part == "logs" and i + 2 < len(parts)
+    ]
+    if source.startswith(("http://", "https://")) and "view" in parts:
+        found.append(parts[-1])
+    for part in found:
+        if build_id_pattern.fullmatch(part):
+            return part
+    return None
+
+
+def run_id(source):
+    """Build ID of a job URL or artifacts path, else the whole URL or path.
+
+    Builds all have the same file names, i.e. build-log.txt, so the name
+    alone would merge different runs.
+    """
+    return build_id(source) or source
+
+
+def run_ids(sources):
+    """Return {source: run ID}, exiting when two sources are the same run."""
+    ids = {}
+    seen = {}
+    for source in sources:
+        run = run_id(source)
+        if run in seen:
+            sys.exit(f"{seen[run]} and {source} are both run {run}")
+        seen[run] = source
+        ids[source] = run
+    return ids
+
+
+def get_suite(name):
+    found = suite_pattern.search(name)
+    return found.group(0) if found else ""
+
+
+def iter_rows(runs):
+    """Yield a row for every test of every run in {run_id: {test: result}}."""
+    for run, tests in runs.items():
+        for name, test in tests.items():
+            yield {
+                "run_id": run,
+                "test": name,
+                "suite": get_suite(name),
+                "result": test["result"],
+                "time": float(test["time"] or 0),
+            }
+
+
+def write_ndjson(runs, out):
+    with open(out, "a") as f:
+        for row in iter_rows(runs):
+            f.write(json.dumps(row) + "\n")
+
+
+def write_parquet(runs, out):
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("install the pyarrow package to write Parquet")
+    columns = {column: [] for column in COLUMNS}
+    for row in iter_rows(runs):
+        for column in COLUMNS:
+            columns[column].append(row[column])
+    # Typed columns, so that a run without tests still has the schema
+    schema = pyarrow.schema(
+        [(column, pyarrow.string()) for column in COLUMNS[:-1]]
+        + [("time", pyarrow.float64())]
+    )
+    table = pyarrow.table(columns, schema=schema)
+    pyarrow.parquet.write_table(table, out, compression="zstd")
+
+
+def write_runs(runs, out, format):
+    """Write {run_id: {test: result}} as a history table of the given format."""
+    if format == "ndjson":
+        write_ndjson(runs, out)
+    elif format == "parquet":
+        write_parquet(runs, out)
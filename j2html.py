@@ -11,7 +11,10 @@ import re
 from jinja2 import Template
 
 from xml.sax import saxutils
-from junitparser import JUnitXml, TestSuite
+from junitparser import TestSuite
+
+from archive import open_inputs
+from junit_reader import iter_tests
 
 
 HTML_TMPL = r"""<?xml version="1.0" encoding="UTF-8"?>
@@ -310,20 +313,17 @@ def time_format(t):
 
 class HTMLReport:
     def __init__(self, args):
+        files = open_inputs(args.files, getattr(args, "archive", None))
         if args.format == "xml":
-            all_xml = JUnitXml.fromfile(args.files[0])
-            for i in args.files[1:]:
-                all_xml += JUnitXml.fromfile(i)
-            if len(args.files) > 1:
-                all_xml = self.merge(all_xml)
-            if isinstance(all_xml, JUnitXml):
-                all_xml = self.merge([i for i in all_xml])
+            # One testcase at a time, only tests kept by merge hold their output
+            all_xml = self.merge(
+                test for f in files for test in iter_tests(f, output=True)
+            )
             data = self.get_stat(all_xml)
         elif args.format == "json":
             all_json = {}
-            for file in args.files:
-                with open(file, "r") as f:
-                    all_json.update(json.load(f))
+            for f in files:
+                all_json.update(json.load(f))
             data = self.get_stat_json(all_json)
         html_template = Template(HTML_TMPL)
         if args.format == "xml":
@@ -402,7 +402,7 @@ class HTMLReport:
             test_txt = test_name
         elif test_result == 'fail':
             status = "failed"
-            test_txt = ""
+            test_txt = saxutils.escape(test_dict.get("message", ""))
         # has_output = bool(test.system_out or test.system_err or test_txt)
         tid = "t%s.%s" % (cid + 1, tid + 1)
         tid = "p%s" % tid if status in ("passed", "skipped") else "f%s" % tid
@@ -752,6 +752,14 @@ def main():
         choices=["json", "xml"],
         default="xml",
     )
+    parser.add_argument(
+        "-a",
+        "--archive",
+        help=(
+            "Tar archive to stream the files from, files being globs of its "
+            "members, i.e. '*junit_*.xml'. Nothing is extracted to disk."
+        ),
+    )
     parser.add_argument(
         "files",
         nargs="+",
@@ -5,7 +5,11 @@
 import argparse
 import json
 
-from junitparser import JUnitXml, TestSuite
+from junitparser import TestSuite
+
+import history
+from archive import open_inputs
+from junit_reader import iter_tests
 
 
 def get_stat(xml):
@@ -64,6 +68,14 @@ def merge(xml_tests):
     return list(all_tests.values())
 
 
+def load_xml(files):
+    """Read and merge the tests of JUnit XML files, paths or file objects.
+
+    Tests are streamed without their output, one testcase at a time.
+    """
+    return merge(test for f in files for test in iter_tests(f))
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Extract tasks from a playbook."
@@ -74,6 +86,29 @@ def main():
         help="Output file. Default: cnf_result.json",
         default="cnf_result.json",
     )
+    parser.add_argument(
+        "--format",
+        "-f",
+        default="json",
+        choices=history.FORMATS,
+        help=(
+            "Output format. Default: json. ndjson (appended to) and parquet "
+            "write a row per test with run ID, test, suite, result and time."
+        ),
+    )
+    parser.add_argument(
+        "--run-id",
+        help="Run ID column of ndjson and parquet output. "
+        "Default: the Prow build ID in the path of the first file, else the path",
+    )
+    parser.add_argument(
+        "-a",
+        "--archive",
+        help=(
+            "Tar archive to stream the files from, files being globs of its "
+            "members, i.e. '*junit_*.xml'. Nothing is extracted to disk."
+        ),
+    )
     parser.add_argument(
         "files",
         nargs="+",
@@ -81,13 +116,12 @@ def main():
     )
     args = parser.parse_args()
 
-    all_xml = JUnitXml.fromfile(args.files[0])
-    for i in args.files[1:]:
-        all_xml += JUnitXml.fromfile(i)
-    if len(args.files) > 1 or isinstance(all_xml, JUnitXml):
-        all_xml = merge(all_xml)
-    data = get_stat(all_xml)
+    data = get_stat(load_xml(open_inputs(args.files, args.archive)))
 
+    if args.format != "json":
+        run_id = args.run_id or history.run_id(args.archive or args.files[0])
+        history.write_runs({run_id: data["tests"]}, args.output, args.format)
+        return
     with open(args.output, "w") as f:
         f.write(json.dumps(data))
 
@@ -0,0 +1,104 @@
+"""Stream the test cases of JUnit XML files with iterparse.
+
+JUnitXml.fromfile keeps the whole document, every captured system-out
+and system-err included, in memory. iter_tests reads one testcase at a
+time into a TestRecord and drops its element right away, so memory
+holds a single testcase plus the records. Records answer the parts of
+the junitparser TestCase API the reports use, and come in the same order
+as iterating the suites of a JUnitXml.
+"""
+
+import xml.etree.ElementTree as etree
+
+RESULT_TAGS = ("failure", "error", "skipped")
+
+
+def child_text(elem, tag):
+    child = elem.find(tag)
+    return None if child is None else child.text
+
+
+class Result:
+    """Failure, error or skipped result of a test case."""
+
+    __slots__ = ("tag", "type", "text")
+
+    def __init__(self, tag, type, text=None):
+        self.tag = tag
+        self.type = type
+        self.text = text
+
+
+class TestRecord:
+    """Name, time, results and, when asked for, the output of a test case."""
+
+    __slots__ = ("name", "time", "result", "system_out", "system_err")
+
+    def __init__(self, elem, output=False):
+        self.name = elem.get("name")
+        # Parsed the way junitparser parses the time attribute
+        time = elem.get("time")
+        self.time = float(time.replace(",", "")) if time else None
+        self.result = [
+            Result(child.tag, child.get("type"), child.text if output else None)
+            for child in elem.iter()
+            if child.tag in RESULT_TAGS
+        ]
+        self.system_out = self.system_err = None
+        if output:
+            self.system_out = child_text(elem, "system-out")
+            self.system_err = child_text(elem, "system-err")
+
+    @property
+    def is_passed(self):
+        return not self.result
+
+    @property
+    def is_skipped(self):
+        return any(r.tag == "skipped" for r in self.result)
+
+
+def iter_tests(source, output=False):
+    """Yield a TestRecord for every testcase of a JUnit XML file.
+
+    source is a path or a binary file object. Test output and result texts
+    are only kept with output. Like junitparser, a suite yields its own
+    testcases before those of its nested suites, so cases of nested suites
+    wait for the end of their top-level suite.
+    """
+    # Elements from the root down to the current one
+    path = []
+    # Per open suite, its own cases and the cases of its nested suites
+    suites = []
+    case_depth = None
+    for event, elem in etree.iterparse(source, events=("start", "end")):
+        if event == "start":
+            path.append(elem)
+            if elem.tag == "testcase" and case_depth is None:
+                case_depth = len(path)
+            elif elem.tag == "testsuite" and case_depth is None:
+                suites.append(([], []))
+            continue
+        path.pop()
+        if case_depth is not None and len(path) >= case_depth:
+            # Inside a testcase, kept until the testcase ends
+            continue
+        if elem.tag == "testcase":
+            case_depth = None
+            # Cases outside of a suite are not iterated by junitparser
+            if suites:
+                record = TestRecord(elem, output)
+                if len(suites) == 1:
+                    yield record
+                else:
+                    suites[-1][0].append(record)
+        elif elem.tag == "testsuite":
+            cases, nested = suites.pop()
+            if suites:
+                suites[-1][1].extend(cases + nested)
+            else:
+                yield from nested
+        # Drop what was read, the parent then holds no finished children
+        elem.clear()
+        if path:
+            path[-1].remove(elem)
@@ -1,259 +1,240 @@
 #!/usr/bin/env python3
 
 import argparse
+import glob
 import json
 import os
-import re
-import requests
 import sys
-
-ansi = re.compile(r"(\x9B|\x1B\[)[0-?]*[ -\/]*[@-~]")
-color_code_pattern = re.compile(r"\033\[[0-9;]*m")
-ttime = re.compile(r"([\d\.]+) seconds")
-spex_time = re.compile(r"Ran \d+ of \d+ Specs in ([\d\.]+) seconds")
-validation_re = r"^\W*(?:validation)?\W*(%s)\W"
-test_re = r"^\W*(?:\[r[fe][fe]_id[^]]*\])?(?:\[test_id[^]]*\])?\W*(%s)\W"
-
-SUITES = [
-    "vrf",
-    "sctp",
-    "serial",
-    "sriov",
-    "gatekeeper",
-    "tuningcni",
-    "pao",
-    "metallb",
-    "xt_u32",
-    "sro",
-    "performance",
-    "ptp",
-    "bondcni",
-    "ovs_qos",
-    "s2i",
-    "dpdk",
-    "fec",
-    "multinetworkpolicy",
-]
-
-
-def clean_line(line):
-    line = color_code_pattern.sub("", line.strip())
-    # line = line.strip('\n')
-    return line
-
-
-def get_time(x):
-    if "seconds" not in "".join(x):
-        return "0"
-    found = ttime.search("".join(x))
-    if found:
-        return found.group(1)
-
-
-def get_name(x, validation=False):
-    whole = "".join(x)
-    regex = validation_re if validation else test_re
-
-    for t in SUITES:
-        if t in whole:
-            break
-    else:
-        return None
-    name = ""
-    for ind, line in enumerate(x):
-        line = clean_line(line)
-        for t in SUITES:
-            if (t in line and re.search(regex % t, line)) or (
-                t == "metallb" and "MetalLB" in line
-            ):
-                name = line
-                if len(x) > (ind + 1):
-                    name += " " + clean_line(x[ind + 1])
-                name = name.strip('"')
-                break
-        if name:
-            break
-    # name = ansi.sub('', name)
-    return name
-
-
-def get_result(x):
-    for line in x:
-        line = clean_line(line)
-        if "• Failure " in line:
-            return "fail"
-        if "S [SKIPPING]" in line:
-            return "skip"
-        if "•" in line:
-            return "pass"
-    return "skip"
-
-
-def spex_found(x):
-    return spex_time.search("\n".join(x))
-
-
-def update_spex(r, x):
-    total_time = float(spex_time.search("\n".join(x)).group(1))
-    cycle_time = r["total_cycle_time"]
-    del r["total_cycle_time"]
-    leftover = total_time - cycle_time
-    fails = {k: v for k, v in r.items() if v["result"] == "fail"}
-    if not fails:
-        return r
-    time_add = leftover / len(fails)
-    for k, _ in fails.items():
-        r[k]["time"] += time_add
-    return r
-
-
-def get_artifact_link(url):
-    if "/artifacts" in url:
-        url = url.split("/artifacts")[0]
-        return url
-    q = requests.get(url)
-    if not q.ok:
-        return None
-    ff = q.text
-    link = None
-    art_re = re.compile(r'<a href="([^"]+)">Artifacts</a>')
-    for line in ff.split("\n"):
-        if art_re.search(line):
-            link = art_re.search(line).group(1)
-    if not link:
-        return None
-    return link
-
-
-def get_files_by_url(url):
-    link = get_artifact_link(url)
-    if not link:
-        print(f"Can't get artifacts link from URL {url}")
-        sys.exit(1)
-    build_id = url.strip("/").split("/")[-1]
-    art_link = link + "/artifacts/e2e-telco5g-cnftests/telco5g-cnf-tests/build-log.txt"
-    nf = requests.get(art_link)
-    if not nf or not nf.ok:
-        print(f"Can't get results for build {build_id}")
-        return
-    f_path = os.path.join("/tmp", f"build_log_{build_id}.log")
-    with open(f_path, "w") as g:
-        g.write(nf.text)
-    return f_path
-
-
-def parse_test_data(fpath):
-    res = {}
-    with open(fpath, encoding="utf-8") as f:
-        text = f.readlines()
-    start = 0
-    for ind, line in enumerate(text):
-        if "Running Suite: CNF Features e2e integration tests" in line:
-            start = ind
-            break
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ginkgo_log import (
+    SEPARATOR,
+    TAIL_SIZE,
+    make_parsers,
+    merge_results,
+    parse_files,
+    parse_stream,
+    parse_summary,
+    read_tail,
+)
+import history
+import profiling
+import prow
+from archive import iter_members
+from prow import get_files_by_url
+
+
+def work_out(result, out, format, run_id=None):
+    """Write the result of one run, or the results of a batch keyed by source.
+
+    Unlike json, ndjson and parquet hold rows of (run_id, test, ...), so one
+    file can collect many runs; ndjson output is appended to.
+    """
+    if format == "json":
+        with open(out, "w") as f:
+            json.dump(result, f)
+    elif run_id:
+        history.write_runs({run_id: result}, out, format)
     else:
-        return res
-
-    need = text[start:]
-    tests_list = []
-    chunk = []
-    for line in need:
-        if "------------------------------" in line:
-            if chunk:
-                tests_list.append(chunk)
-            chunk = []
+        ids = history.run_ids(result)
+        runs = {ids[source]: res for source, res in result.items()}
+        history.write_runs(runs, out, format)
+
+
+def save_follow(path, offset, parsers, out, format):
+    """Write the results so far and the state needed to resume after them.
+
+    Both files are replaced atomically, readers never see a partial file.
+    """
+    work_out(merge_results(parsers), out + ".tmp", format)
+    os.replace(out + ".tmp", out)
+    state = {
+        "path": os.path.abspath(path),
+        "offset": offset,
+        # Unfinished chunks are raw log bytes, latin-1 keeps them intact
+        "parsers": [
+            dict(vars(parser), chunk=b"".join(parser.chunk).decode("latin-1"))
+            for parser in parsers
+        ],
+    }
+    with open(out + ".follow.tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(out + ".follow.tmp", out + ".follow")
+
+
+def load_follow(path, parsers, out):
+    """Restore parser state saved by save_follow, return the offset to resume from."""
+    try:
+        with open(out + ".follow") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    # A different or truncated log starts over
+    if (state["path"] != os.path.abspath(path)
+            or state["offset"] > os.path.getsize(path)
+            or len(state["parsers"]) != len(parsers)):
+        return 0
+    for parser, saved in zip(parsers, state["parsers"]):
+        saved["chunk"] = [saved["chunk"].encode("latin-1")]
+        vars(parser).update(saved)
+    return state["offset"]
+
+
+def follow_log(path, test_type, out, format, interval=10, idle_timeout=600):
+    """Parse a log that is still being written, like tail -f.
+
+    Every poll parses only the complete lines appended since the last one.
+    Whenever a test was completed the output is rewritten, together with
+    <out>.follow which holds the offset and parser state, so that a
+    restarted follow continues where the previous one stopped. Gives up
+    once the log hasn't grown for idle_timeout seconds.
+    """
+    parsers = make_parsers(test_type)
+    offset = load_follow(path, parsers, out)
+    idle = 0
+    size = None
+    with open(path, "rb") as f:
+        f.seek(offset)
+        try:
+            while idle < idle_timeout:
+                # A log growing by a partial line or an unfinished test is
+                # not idle either
+                last, size = size, os.fstat(f.fileno()).st_size
+                completed = False
+                for line in f:
+                    # Wait for the writer to finish a partial last line
+                    if not line.endswith(b"\n"):
+                        f.seek(offset)
+                        break
+                    offset += len(line)
+                    completed = completed or SEPARATOR in line
+                    for parser in parsers:
+                        parser.feed(line)
+                if completed:
+                    save_follow(path, offset, parsers, out, format)
+                else:
+                    time.sleep(interval)
+                idle = 0 if size != last else idle + interval
+        except KeyboardInterrupt:
+            pass
+    save_follow(path, offset, parsers, out, format)
+
+
+def get_summary(source, tail_size=TAIL_SIZE):
+    """Return the final Ginkgo summary of a log path or job URL.
+
+    Only the last tail_size bytes of the log are read, a remote log is
+    asked for just those with an HTTP Range request.
+    """
+    if source.startswith(("http://", "https://")):
+        build_id = source.strip("/").split("/")[-1]
+        f_path = None if "/artifacts" in source else prow.cached_log(build_id)
+        if f_path:
+            data = read_tail(f_path, tail_size)
         else:
-            if ("/tmp" not in line
-                and "[BeforeEach]" not in line
-                    and "[It]" not in line):
-                chunk.append(line)
-
-    for z in tests_list:
-        name = get_name(z)
-        if name:
-            time = get_time(z)
-            test_result = get_result(z)
-            res[name] = {"time": time, "result": test_result}
-
-    return res
-
-
-def parse_validation_data(fpath):
-    res = {"total_cycle_time": 0}
-    with open(fpath, encoding="utf-8") as f:
-        text = f.readlines()
-    start = 0
-    end = len(text)
-    t_started = False
-    for ind, line in enumerate(text):
-        if "Running Suite: CNF Features e2e validation" in line:
-            t_started = True
-        if t_started and "------------------------------" in line:
-            start = ind
-            break
+            data = prow.fetch_tail(prow.build_log_url(source), tail_size)
+            if data is None:
+                sys.exit(f"Can't get the build log of {source}")
     else:
-        return res
-    for ind, line in enumerate(text):
-        if "Running Suite: CNF Features e2e integration tests" in line or (
-            "Running Suite: CNF Features e2e setup" in line
-        ):
-            end = ind
-            break
-
-    need = text[start:end]
-    tests_list = []
-    chunk = []
-    for line in need:
-        if "------------------------------" in line or (
-            "Running Suite: CNF Features e2e validation" in line
-        ):
-            if chunk:
-                tests_list.append(chunk)
-            chunk = []
-        else:
-            if ("/tmp" not in line
-                and "[BeforeEach]" not in line
-                    and "[It]" not in line):
-                chunk.append(line)
-
-    for z in tests_list:
-        name = get_name(z, validation=True)
-        if name:
-            time = float(get_time(z))
-            test_result = get_result(z)
-            if name not in res:
-                res[name] = {"time": time, "result": test_result}
-            else:
-                full_test_time = res[name]["time"] + time
-                res[name] = {"time": full_test_time, "result": test_result}
-            res["total_cycle_time"] += time
-        if spex_found(z):
-            res = update_spex(res, z)
-            res["total_cycle_time"] = 0
-    del res["total_cycle_time"]
-    return res
-
-
-def work_out(result, out, format):
-    with open(out, "w") as f:
-        if format == "json":
-            json.dump(result, f)
-
+        data = read_tail(source, tail_size)
+    summary = parse_summary(data)
+    if summary is None:
+        sys.exit(f"No Ginkgo summary in the last {tail_size} bytes of {source}")
+    return summary
 
-def parse_files(path, test_type):
-    if test_type == "validations":
-        file_data = parse_validation_data(path)
-    elif test_type == "tests":
-        file_data = parse_test_data(path)
-    elif test_type == "all":
-        file_data = parse_validation_data(path)
-        file_data.update(parse_test_data(path))
-    return file_data
 
-
-def parse_url(job_url, test_type):
+def parse_url(job_url, test_type, index=False, workers=None):
     file_p = get_files_by_url(job_url)
-    return parse_files(file_p, test_type)
+    return parse_files(file_p, test_type, index, workers=workers)
+
+
+def expand_sources(paths, urls):
+    """Expand globs in log paths, keep job URLs as they are.
+
+    Section indexes kept next to the logs by --index are no logs.
+    """
+    sources = []
+    for path in paths or []:
+        sources.extend(
+            p for p in sorted(glob.glob(path)) or [path]
+            if not p.endswith(".sections.json")
+        )
+    sources.extend(urls or [])
+    return sources
+
+
+def output_name(source, format="json"):
+    """File name of the result of a source in the output directory.
+
+    The Prow build ID, else the file name after its parent directory, so
+    that build-log.txt of different builds don't overwrite each other.
+    """
+    name = history.build_id(source)
+    if not name:
+        parent, base = os.path.split(source.rstrip("/"))
+        name = os.path.splitext(base)[0]
+        if os.path.basename(parent):
+            name = os.path.basename(parent) + "-" + name
+    return name + "." + format
+
+
+def output_names(sources, format="json"):
+    """Return {source: output file name}, exiting when two names collide."""
+    names = {}
+    seen = {}
+    for source in sources:
+        name = output_name(source, format)
+        if name in seen and seen[name] != source:
+            sys.exit(f"{seen[name]} and {source} would both be written to {name}")
+        seen[name] = source
+        names[source] = name
+    return names
+
+
+def parse_source(source, test_type, index=False, summary_only=False):
+    """Parse one log path or job URL, returning (source, result, error).
+
+    Errors are returned instead of raised so a bad log in a batch does not
+    abort the others.
+    """
+    try:
+        if summary_only:
+            result = get_summary(source)
+        elif source.startswith(("http://", "https://")):
+            result = parse_url(source, test_type, index)
+        else:
+            result = parse_files(source, test_type, index)
+    except (Exception, SystemExit) as e:
+        return source, None, str(e) or type(e).__name__
+    return source, result, None
+
+
+def parse_archive(path, patterns, test_type):
+    """Parse the logs of a tar archive matching patterns, keyed by member."""
+    return {
+        name: parse_stream(f, test_type) for name, f in iter_members(path, patterns)
+    }
+
+
+def parse_batch(sources, test_type, jobs=None, index=False, summary_only=False):
+    """Parse many logs in parallel, return results keyed by source and failures."""
+    results = {}
+    failed = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(parse_source, source, test_type, index, summary_only)
+            for source in sources
+        ]
+        for num, future in enumerate(as_completed(futures), 1):
+            source, result, error = future.result()
+            if error:
+                failed.append(source)
+                print(f"[{num}/{len(sources)}] {source}: {error}", file=sys.stderr)
+            else:
+                results[source] = result
+                print(f"[{num}/{len(sources)}] {source}", file=sys.stderr)
+    return {s: results[s] for s in sources if s in results}, failed
 
 
 def main():
@@ -264,9 +245,24 @@ def main():
     parser.add_argument(
         "-u",
         "--job-url",
-        help="URL of the job from Prow.",
+        nargs="+",
+        help="URL of the job from Prow, several URLs run in batch mode.",
+    )
+    parser.add_argument(
+        "-p",
+        "--path",
+        nargs="+",
+        help="File path with ginkgo log, several paths or globs run in batch mode.",
+    )
+    parser.add_argument(
+        "-a",
+        "--archive",
+        help=(
+            "Tar archive to stream logs from, --path being globs of its "
+            "members. Nothing is extracted to disk. Default --path: "
+            "build-log.txt"
+        ),
     )
-    parser.add_argument("-p", "--path", help="File path with ginkgo log.")
     parser.add_argument(
         "-o",
         "--output-file",
@@ -277,8 +273,16 @@ def main():
         "-f",
         "--format",
         default="json",
-        choices=["json"],
-        help="Output file format (default=json).",
+        choices=history.FORMATS,
+        help=(
+            "Output file format (default=json). ndjson and parquet write a "
+            "row per test with run ID, test, suite, result and time."
+        ),
+    )
+    parser.add_argument(
+        "--run-id",
+        help="Run ID column of ndjson and parquet output. Default: the Prow "
+        "build ID in the job URL or log path, else the URL or path",
     )
     parser.add_argument(
         "-t",
@@ -290,14 +294,174 @@ def main():
             "Default: %(default)s"
         ),
     )
+    parser.add_argument(
+        "-i",
+        "--index",
+        action="store_true",
+        help=(
+            "Keep a section index next to the log (<log>.sections.json) "
+            "and seek straight to the suites that are needed."
+        ),
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help=(
+            "Parallel workers in batch mode. Default: number of CPUs. With a "
+            "single log, split it at spec separators and parse the parts in "
+            "this many processes."
+        ),
+    )
+    parser.add_argument(
+        "-d",
+        "--output-dir",
+        help=(
+            "Batch mode: write one result file per input into this directory "
+            "instead of a single file keyed by input."
+        ),
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Seconds before a stalled Prow request is given up. Default: %s"
+        % prow.SETTINGS["timeout"],
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        help="Retries of failed Prow requests, with exponential backoff. "
+        "Default: %s" % prow.SETTINGS["retries"],
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Keep downloaded build logs in this directory and reuse them.",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=2048,
+        help="Size in MiB the log cache is trimmed to. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Revalidate cached logs with the server (ETag/Last-Modified).",
+    )
+    parser.add_argument(
+        "-r",
+        "--json-report",
+        help=(
+            "Ginkgo JSON report (--json-report) to read instead of scraping "
+            "the log. By default <log>.report.json is used when it exists."
+        ),
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help=(
+            "Keep parsing a log that is still being written, updating the "
+            "output after each test. Needs a single --path."
+        ),
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=10,
+        help="Seconds between checks for new lines in follow mode. "
+        "Default: %(default)s",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=600,
+        help="Stop following after the log hasn't grown for this many seconds. "
+        "Default: %(default)s",
+    )
+    parser.add_argument(
+        "--summary-only",
+        action="store_true",
+        help=(
+            "Only read the end of each log and output the totals of the final "
+            "Ginkgo summary: specs ran, time, status and spec counts."
+        ),
+    )
+    profiling.add_arguments(parser)
     args = parser.parse_args()
-    if args.job_url:
-        result = parse_url(args.job_url, args.test_type)
-
-    if args.path:
-        result = parse_files(args.path, args.test_type)
-
-    work_out(result, args.output_file, args.format)
+    profiling.from_args(args, sys.modules[__name__])
+    if not (args.path or args.job_url or args.archive):
+        parser.error("give --path, --job-url or --archive")
+    if args.summary_only and (args.follow or args.format != "json"):
+        parser.error("--summary-only writes json only and can't --follow")
+    if args.archive and (args.job_url or args.summary_only):
+        parser.error("--archive can't be combined with --job-url or --summary-only")
+    if args.follow:
+        if args.job_url or args.archive or not args.path or len(args.path) != 1:
+            parser.error("--follow needs exactly one --path")
+        if args.format != "json":
+            parser.error("--follow writes json only")
+        follow_log(
+            args.path[0],
+            args.test_type,
+            args.output_file,
+            args.format,
+            args.poll_interval,
+            args.idle_timeout,
+        )
+        return
+    prow.configure(
+        timeout=args.timeout,
+        retries=args.retries,
+        cache_dir=args.cache_dir,
+        cache_size=args.cache_size * 1024 ** 2,
+        refresh=args.refresh,
+    )
+    if args.archive:
+        results = parse_archive(
+            args.archive, args.path or ["build-log.txt"], args.test_type
+        )
+        sources = list(results)
+        failed = []
+        if len(results) == 1 and not args.output_dir:
+            run_id = args.run_id or history.run_id(args.archive)
+            work_out(results[sources[0]], args.output_file, args.format, run_id)
+            return
+    else:
+        sources = expand_sources(args.path, args.job_url)
+        # Fail before parsing, not after hours of a batch
+        if args.output_dir:
+            output_names(sources, args.format)
+        elif args.format != "json":
+            history.run_ids(sources)
+        if len(sources) == 1 and not args.output_dir:
+            if args.summary_only:
+                result = get_summary(sources[0])
+            elif args.job_url:
+                result = parse_url(sources[0], args.test_type, args.index, args.jobs)
+            else:
+                result = parse_files(
+                    sources[0], args.test_type, args.index, args.json_report, args.jobs
+                )
+            run_id = args.run_id or history.run_id(sources[0])
+            work_out(result, args.output_file, args.format, run_id)
+            return
+        results, failed = parse_batch(
+            sources, args.test_type, args.jobs, args.index, args.summary_only
+        )
+    if args.output_dir:
+        names = output_names(results, args.format)
+        os.makedirs(args.output_dir, exist_ok=True)
+        for source, result in results.items():
+            out = os.path.join(args.output_dir, names[source])
+            work_out(result, out, args.format, history.run_id(source))
+    else:
+        work_out(results, args.output_file, args.format)
+    if failed:
+        print(
+            f"Failed to parse {len(failed)} of {len(sources)} inputs",
+            file=sys.stderr,
+        )
+        sys.exit(1)
 
 
 if __name__ == "__main__":
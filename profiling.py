@@ -0,0 +1,201 @@
+"""Opt-in timing and profiling of the log parsing CLIs.
+
+Nothing here costs anything unless --profile or --profile-output is given.
+Then instrument() swaps the functions and compiled patterns of a parser
+module for timed wrappers, so the parsers themselves carry no hooks.
+"""
+
+import atexit
+import cProfile
+import functools
+import json
+import resource
+import sys
+import time
+
+import ginkgo_log
+
+# Functions of a parser module timed as stages, with peak RSS after each
+TOP_STAGES = {
+    "get_files_by_url": "download",
+    "parse_files": "parse",
+    "work_out": "write",
+}
+FUNCTIONS = ["get_name", "get_result", "get_time", "clean_line"]
+PATTERNS = [
+    "suite_pattern",
+    "test_pattern",
+    "validation_pattern",
+    "color_code_pattern",
+    "ttime",
+    "spex_time",
+]
+# Keep traces of huge logs loadable
+MAX_EVENTS = 200000
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print time, calls and peak memory of each parsing stage.",
+    )
+    parser.add_argument(
+        "--profile-output",
+        help=(
+            "Also dump a profile: a .json file gets a trace viewable in "
+            "speedscope or Perfetto, anything else a cProfile dump."
+        ),
+    )
+
+
+def from_args(args, module):
+    """Instrument module when the CLI asked for profiling.
+
+    The line helpers and patterns live in ginkgo_log, so it is instrumented
+    as well, except for the stages which are timed in the CLI module.
+    """
+    if not (args.profile or args.profile_output):
+        return None
+    profiler = Profiler(args.profile_output)
+    profiler.instrument(module)
+    profiler.instrument(ginkgo_log, stages=False)
+    return profiler
+
+
+class TimedPattern:
+    """Stand-in for a compiled regex that times every method call."""
+
+    def __init__(self, profiler, name, pattern):
+        self.profiler = profiler
+        self.name = name
+        self.pattern = pattern
+
+    def __getattr__(self, attr):
+        method = getattr(self.pattern, attr)
+        if not callable(method):
+            return method
+        return self.profiler.timed(f"re {self.name}.{attr}", method)
+
+
+class CountedFile:
+    """File wrapper timing the reads from a log and counting its lines."""
+
+    def __init__(self, profiler, f):
+        self.profiler = profiler
+        self.f = f
+
+    def __enter__(self):
+        self.f.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self.f.__exit__(*exc)
+
+    def read(self, *args):
+        started = time.perf_counter()
+        data = self.f.read(*args)
+        self.profiler.record("read", started)
+        self.profiler.stat("read lines")["calls"] += data.count(b"\n")
+        return data
+
+    def readline(self, *args):
+        started = time.perf_counter()
+        line = self.f.readline(*args)
+        self.profiler.record("readline", started)
+        self.profiler.stat("read lines")["calls"] += line.count(b"\n")
+        return line
+
+    def __getattr__(self, attr):
+        return getattr(self.f, attr)
+
+
+class Profiler:
+    def __init__(self, output=None):
+        self.output = output
+        self.stats = {}
+        self.events = []
+        self.start = time.perf_counter()
+        self.cprofile = None
+        if output and not output.endswith(".json"):
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        atexit.register(self.finish)
+
+    def stat(self, name):
+        if name not in self.stats:
+            self.stats[name] = {"calls": 0, "time": 0.0, "peak_rss": None}
+        return self.stats[name]
+
+    def record(self, name, started, top=False):
+        ended = time.perf_counter()
+        stat = self.stat(name)
+        stat["calls"] += 1
+        stat["time"] += ended - started
+        if top:
+            # ru_maxrss is in KiB on Linux
+            stat["peak_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if len(self.events) < MAX_EVENTS:
+            self.events.append({
+                "name": name,
+                "ph": "X",
+                "ts": (started - self.start) * 1e6,
+                "dur": (ended - started) * 1e6,
+                "pid": 0,
+                "tid": 0,
+            })
+
+    def timed(self, name, func, top=False):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, started, top)
+        return wrapper
+
+    def instrument(self, module, stages=True):
+        for func, stage in TOP_STAGES.items():
+            if stages and hasattr(module, func):
+                setattr(module, func, self.timed(stage, getattr(module, func), True))
+        for func in FUNCTIONS:
+            if hasattr(module, func):
+                setattr(module, func, self.timed(func, getattr(module, func)))
+        for name in PATTERNS:
+            if hasattr(module, name):
+                setattr(module, name, TimedPattern(self, name, getattr(module, name)))
+        if hasattr(module, "split_chunks"):
+            split_chunks = self.timed("split_chunks", module.split_chunks)
+
+            def counted_split_chunks(*args, **kwargs):
+                chunks, rest = split_chunks(*args, **kwargs)
+                self.stat("chunks")["calls"] += len(chunks)
+                return chunks, rest
+            module.split_chunks = counted_split_chunks
+        if hasattr(module, "open_log"):
+            open_log = module.open_log
+
+            def counted_open_log(*args, **kwargs):
+                return CountedFile(self, open_log(*args, **kwargs))
+            module.open_log = counted_open_log
+
+    def report(self):
+        print(f"\n{'Stage':<32}{'Calls':>10}{'Total s':>10}{'Per call us':>13}"
+              f"{'Peak RSS MB':>13}", file=sys.stderr)
+        for name, stat in self.stats.items():
+            per_call = stat["time"] / stat["calls"] * 1e6 if stat["calls"] else 0
+            rss = f"{stat['peak_rss'] / 1024:.1f}" if stat["peak_rss"] else ""
+            print(f"{name:<32}{stat['calls']:>10}{stat['time']:>10.3f}"
+                  f"{per_call:>13.1f}{rss:>13}", file=sys.stderr)
+        print(f"{'wall time':<32}{'':>10}{time.perf_counter() - self.start:>10.3f}",
+              file=sys.stderr)
+
+    def finish(self):
+        if self.cprofile:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.output)
+        elif self.output:
+            with open(self.output, "w") as f:
+                json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        self.report()
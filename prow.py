@@ -0,0 +1,364 @@
+"""Shared HTTP session for fetching Prow job pages and artifacts.
+
+All URL based tools go through get() so that connections are reused
+across requests, stalled requests time out and transient failures are
+retried with exponential backoff.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import history
+
+SETTINGS = {
+    # Seconds to wait for a connection and then between received bytes
+    "timeout": 60,
+    "retries": 5,
+    # Sleep between retries is backoff * 2 ** (retry number - 1)
+    "backoff": 0.5,
+    # Connections kept open, and opened at most at once, per host
+    "max_connections": 8,
+    # Directory of the build log cache, None disables caching
+    "cache_dir": None,
+    "cache_size": 2 * 1024 ** 3,
+    # Revalidate cached logs with the server instead of trusting them
+    "refresh": False,
+}
+RETRY_STATUSES = (500, 502, 503, 504)
+PROW_URL = "https://prow.ci.openshift.org"
+JOB_HISTORY = "/job-history/gs/origin-ci-test/logs/"
+BUILD_LOG = "/artifacts/e2e-telco5g-cnftests/telco5g-cnf-tests/build-log.txt"
+
+_session = None
+_lock = threading.Lock()
+
+
+def configure(**settings):
+    """Override SETTINGS, the session is rebuilt on next use."""
+    global _session
+    with _lock:
+        SETTINGS.update({k: v for k, v in settings.items() if v is not None})
+        _session = None
+
+
+def get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            retry = Retry(
+                total=SETTINGS["retries"],
+                backoff_factor=SETTINGS["backoff"],
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=["GET", "HEAD"],
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                max_retries=retry,
+                pool_connections=SETTINGS["max_connections"],
+                pool_maxsize=SETTINGS["max_connections"],
+                pool_block=True,
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def get(url, **kwargs):
+    kwargs.setdefault("timeout", SETTINGS["timeout"])
+    return get_session().get(url, **kwargs)
+
+
+def download(url, f_path, validators=None, retries=3, chunk_size=1024 * 1024):
+    """Stream url to f_path chunk by chunk.
+
+    Data goes to f_path.part first. When the connection drops the transfer
+    is resumed from the end of the partial file with an HTTP Range request.
+
+    Return the ETag and Last-Modified of the downloaded file, or None if it
+    could not be fetched. When the validators of the copy already at f_path
+    are given, a 304 answer leaves that copy untouched.
+    """
+    part = f_path + ".part"
+    new = {"etag": None, "last_modified": None}
+    for attempt in range(retries + 1):
+        have = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {}
+        if have:
+            headers["Range"] = f"bytes={have}-"
+        elif validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+        try:
+            with get(url, headers=headers, stream=True) as r:
+                if r.status_code == 304:
+                    return validators
+                # 416 means the partial file already holds the whole log
+                if r.status_code == 416:
+                    break
+                if not r.ok:
+                    return None
+                new = {
+                    "etag": r.headers.get("ETag"),
+                    "last_modified": r.headers.get("Last-Modified"),
+                }
+                # A 200 means the server ignored Range and resent the whole log
+                mode = "ab" if r.status_code == 206 else "wb"
+                with open(part, mode) as g:
+                    for chunk in r.iter_content(chunk_size):
+                        g.write(chunk)
+            break
+        except (requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError):
+            if attempt == retries:
+                return None
+    os.replace(part, f_path)
+    return new
+
+
+class LogCache:
+    """Build logs kept on disk between runs.
+
+    index.json maps each artifact URL to its file, build ID, size, HTTP
+    validators and last use. Once the files outgrow max_size the least
+    recently used ones are removed.
+    """
+
+    def __init__(self, path, max_size):
+        self.path = path
+        self.max_size = max_size
+        self.index_path = os.path.join(path, "index.json")
+        os.makedirs(path, exist_ok=True)
+
+    @contextmanager
+    def index(self):
+        """Load the index under an exclusive lock and save it on exit."""
+        with open(os.path.join(self.path, "index.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(self.index_path) as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                index = {}
+            yield index
+            with open(self.index_path + ".tmp", "w") as f:
+                json.dump(index, f)
+            os.replace(self.index_path + ".tmp", self.index_path)
+
+    def find(self, index, url=None, build_id=None):
+        for key, entry in list(index.items()):
+            if key != url and (not build_id or entry["build_id"] != build_id):
+                continue
+            if not os.path.exists(os.path.join(self.path, entry["file"])):
+                del index[key]
+                continue
+            entry["used"] = time.time()
+            return entry
+        return None
+
+    def lookup(self, url=None, build_id=None):
+        """Return the cached log path for an artifact URL or build ID."""
+        with self.index() as index:
+            entry = self.find(index, url, build_id)
+        if entry:
+            return os.path.join(self.path, entry["file"])
+        return None
+
+    def fetch(self, url, build_id, refresh=False):
+        """Return a local copy of url, downloading it only when needed.
+
+        With refresh a cached copy is revalidated with a conditional request.
+        A download holds a lock file of its URL, so processes fetching the
+        same URL wait for it and then use its copy.
+        """
+        digest = hashlib.sha1(url.encode()).hexdigest()[:12]
+        with open(os.path.join(self.path, f"fetch_{digest}.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            with self.index() as index:
+                entry = self.find(index, url)
+            if entry and not refresh:
+                return os.path.join(self.path, entry["file"])
+            name = entry["file"] if entry else f"build_log_{build_id}_{digest}.log"
+            f_path = os.path.join(self.path, name)
+            validators = download(url, f_path, entry and entry["validators"])
+            if validators is None:
+                return None
+            with self.index() as index:
+                index[url] = {
+                    "file": name,
+                    "build_id": build_id,
+                    "size": os.path.getsize(f_path),
+                    "validators": validators,
+                    "used": time.time(),
+                }
+                self.evict(index, keep=url)
+        return f_path
+
+    def evict(self, index, keep):
+        total = sum(entry["size"] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]["used"]):
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            entry = index.pop(key)
+            total -= entry["size"]
+            try:
+                os.remove(os.path.join(self.path, entry["file"]))
+            except OSError:
+                pass
+
+
+def get_cache():
+    if SETTINGS["cache_dir"]:
+        return LogCache(SETTINGS["cache_dir"], SETTINGS["cache_size"])
+    return None
+
+
+def cached_log(build_id):
+    """Return the cached log of build_id, without any network I/O."""
+    cache = get_cache()
+    if cache is None or SETTINGS["refresh"]:
+        return None
+    return cache.lookup(build_id=build_id)
+
+
+def fetch_log(url, build_id):
+    """Download a build log, through the cache when one is configured.
+
+    Return the local path of the log, or None if it can't be fetched.
+    """
+    cache = get_cache()
+    if cache is not None:
+        return cache.fetch(url, build_id, SETTINGS["refresh"])
+    f_path = os.path.join("/tmp", f"build_log_{build_id}.log")
+    if download(url, f_path) is None:
+        return None
+    return f_path
+
+
+def fetch_tail(url, size):
+    """Return the last size bytes of url, asked for with an HTTP Range request.
+
+    Return None if it can't be fetched. A server that ignores Range sends
+    the whole file, of which only the end is kept.
+    """
+    with get(url, headers={"Range": f"bytes=-{size}"}, stream=True) as r:
+        # 416 is what an empty file answers a suffix range with
+        if r.status_code == 416:
+            return b""
+        if not r.ok:
+            return None
+        if r.status_code == 206:
+            return r.content
+        tail = b""
+        for chunk in r.iter_content(1024 * 1024):
+            tail = (tail + chunk)[-size:]
+        return tail
+
+
+def get_artifact_link(url):
+    if "/artifacts" in url:
+        url = url.split("/artifacts")[0]
+        return url
+    q = get(url)
+    if not q.ok:
+        return None
+    ff = q.text
+    link = None
+    art_re = re.compile(r'<a href="([^"]+)">Artifacts</a>')
+    for line in ff.split("\n"):
+        if art_re.search(line):
+            link = art_re.search(line).group(1)
+    if not link:
+        return None
+    return urljoin(url, link)
+
+
+def build_log_url(url):
+    """URL of the cnf-tests build log of a job URL."""
+    link = get_artifact_link(url)
+    if not link:
+        sys.exit(f"Can't get artifacts link from URL {url}")
+    return link + BUILD_LOG
+
+
+def get_files_by_url(url):
+    # Artifact URLs end in "artifacts", the build ID is further up
+    build_id = history.build_id(url) or url.strip("/").split("/")[-1]
+    # A cached job needs no request for its page either
+    if "/artifacts" not in url:
+        f_path = cached_log(build_id)
+        if f_path:
+            return f_path
+    art_link = build_log_url(url)
+    f_path = fetch_log(art_link, build_id)
+    if not f_path:
+        print(f"Can't get results for build {build_id}")
+        return
+    return f_path
+
+
+def job_history_url(job, prow_url=PROW_URL):
+    """History page of a Prow job, given its name or the page URL itself."""
+    if job.startswith(("http://", "https://")):
+        return job
+    return prow_url.rstrip("/") + JOB_HISTORY + job
+
+
+def list_builds(url, max_pages=1):
+    """Return the builds on the history page of a job, newest first.
+
+    Builds are dicts with id, link (the job URL of the build), started
+    (seconds since the epoch) and result, which is PENDING while the job
+    still runs. Up to max_pages pages are read by following the link to
+    older runs.
+    """
+    builds_re = re.compile(r"var allBuilds = (\[.*?\]);", re.S)
+    older_re = re.compile(r'<a href="([^"]+)"[^>]*>\s*&lt;- Older Runs')
+    builds = []
+    seen = set()
+    for _ in range(max_pages):
+        q = get(url)
+        if not q.ok:
+            print(f"Can't get job history from URL {url}", file=sys.stderr)
+            break
+        found = builds_re.search(q.text)
+        page = json.loads(found.group(1)) if found else []
+        new = [build for build in page if build["ID"] not in seen]
+        for build in new:
+            seen.add(build["ID"])
+            started = None
+            if build.get("Started"):
+                started = datetime.fromisoformat(
+                    build["Started"].replace("Z", "+00:00")
+                ).timestamp()
+            builds.append({
+                "id": build["ID"],
+                "link": urljoin(url, build["SpyglassLink"]),
+                "started": started,
+                "result": build.get("Result", ""),
+            })
+        older = older_re.search(q.text)
+        # A page without new builds means the history ends or repeats itself
+        if not new or not older:
+            break
+        url = urljoin(url, older.group(1).replace("&amp;", "&"))
+    return builds
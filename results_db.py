@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+
+"""Keep test results of many runs in a local SQLite database.
+
+ingest loads JUnit XML files, junit2json and parse_log JSON outputs and
+NDJSON history files. Every run is keyed by its build ID, ingesting a run
+again from the same file, or with --build-id, replaces its results. query
+shows the last results of tests.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import history
+from junit2json import get_stat, load_xml
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    build_id TEXT NOT NULL UNIQUE,
+    source TEXT,
+    timestamp REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tests (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    suite TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    test_id INTEGER NOT NULL REFERENCES tests (id),
+    -- Copy of the run timestamp, so the indexes give each test's runs in order
+    timestamp REAL NOT NULL,
+    result TEXT NOT NULL,
+    time REAL,
+    PRIMARY KEY (run_id, test_id)
+);
+CREATE INDEX IF NOT EXISTS runs_timestamp ON runs (timestamp);
+CREATE INDEX IF NOT EXISTS tests_suite ON tests (suite);
+CREATE INDEX IF NOT EXISTS results_test ON results (test_id, timestamp);
+CREATE INDEX IF NOT EXISTS results_test_result
+    ON results (test_id, result, timestamp);
+"""
+# The last results of each test are read newest first from an index, and
+# stop after `limit` rows. Numbering rows with a window function would read
+# and sort the whole history of every matched test instead.
+LAST_RESULTS = """
+SELECT tests.name, tests.suite, runs.build_id, results.timestamp,
+    results.result, results.time
+FROM tests
+JOIN results ON results.rowid IN (
+    SELECT rowid FROM results AS last
+    WHERE last.test_id = tests.id {result_filter}
+    ORDER BY last.timestamp DESC
+    LIMIT :limit
+)
+JOIN runs ON runs.id = results.run_id
+WHERE tests.name LIKE :name AND (:suite IS NULL OR tests.suite = :suite)
+ORDER BY tests.name, results.timestamp DESC
+"""
+
+
+def connect(path):
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA foreign_keys = ON")
+    db.execute("PRAGMA journal_mode = WAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def load_junit(path):
+    """Return {test: result} of a JUnit XML file, the way junit2json does."""
+    return get_stat(load_xml([path]))["tests"]
+
+
+def read_runs(path):
+    """Return {build_id: {test: result}} of one input file.
+
+    Files holding a single run, without a build ID of their own, give it
+    as None.
+    """
+    if path.endswith(".xml"):
+        return {None: load_junit(path)}
+    if path.endswith(".ndjson"):
+        runs = {}
+        with open(path) as f:
+            for line in f:
+                row = json.loads(line)
+                run = runs.setdefault(row["run_id"], {})
+                run[row["test"]] = {"result": row["result"], "time": row["time"]}
+        return runs
+    with open(path) as f:
+        data = json.load(f)
+    # junit2json output, with totals next to the tests
+    if isinstance(data.get("tests"), dict) and "total" in data:
+        return {None: data["tests"]}
+    # parse_log batch output, keyed by the log path or job URL
+    if data and all(
+        isinstance(v, dict) and "result" not in v for v in data.values()
+    ):
+        runs = {}
+        for source, run in data.items():
+            found = history.build_id(source)
+            if not found:
+                sys.exit(f"No build ID in {source} of {path}")
+            if found in runs:
+                sys.exit(f"{path} holds build {found} twice")
+            runs[found] = run
+        return runs
+    return {None: data}
+
+
+def load_runs(path, build_id=None):
+    """Return {build_id: {test: result}} of one input file.
+
+    The build ID of a single run comes from build_id, else from the Prow
+    build directory or URL in the path. File names are no build IDs,
+    every run of a job has the same ones.
+    """
+    runs = read_runs(path)
+    if build_id:
+        if len(runs) != 1:
+            sys.exit(f"{path} holds {len(runs)} runs, --build-id names one")
+        return {build_id: runs.popitem()[1]}
+    if None in runs:
+        found = history.build_id(path)
+        if not found:
+            sys.exit(f"No build ID in the path of {path}, give --build-id")
+        runs[found] = runs.pop(None)
+    return runs
+
+
+def check_source(db, build_id, source):
+    """Exit when the build ID is stored from another source than source."""
+    row = db.execute(
+        "SELECT source FROM runs WHERE build_id = ?", (build_id,)
+    ).fetchone()
+    if row and row[0] != source:
+        sys.exit(
+            f"Build {build_id} of {source} is stored from {row[0]}, "
+            "give --build-id to replace it"
+        )
+
+
+def ingest_run(db, build_id, tests, source, timestamp, replace=False):
+    """Store the results of one run.
+
+    Results stored for the build ID are replaced when they come from the
+    same source, or with replace, else this exits.
+    """
+    with db:
+        if not replace:
+            check_source(db, build_id, source)
+        db.execute(
+            "INSERT INTO runs (build_id, source, timestamp) VALUES (?, ?, ?) "
+            "ON CONFLICT (build_id) DO UPDATE SET "
+            "source = excluded.source, timestamp = excluded.timestamp",
+            (build_id, source, timestamp),
+        )
+        run_id = db.execute(
+            "SELECT id FROM runs WHERE build_id = ?", (build_id,)
+        ).fetchone()[0]
+        db.execute("DELETE FROM results WHERE run_id = ?", (run_id,))
+        db.executemany(
+            "INSERT OR IGNORE INTO tests (name, suite) VALUES (?, ?)",
+            ((name, history.get_suite(name)) for name in tests),
+        )
+        db.executemany(
+            "INSERT INTO results (run_id, test_id, timestamp, result, time) "
+            "SELECT ?, id, ?, ?, ? FROM tests WHERE name = ?",
+            (
+                (run_id, timestamp, test["result"], float(test["time"] or 0), name)
+                for name, test in tests.items()
+            ),
+        )
+
+
+def ingest(db, paths, build_id=None, timestamp=None):
+    """Store the runs of the files, exiting when two are the same build.
+
+    A build already stored from another file is only replaced when build_id
+    names it.
+    """
+    loaded = []
+    seen = {}
+    for path in paths:
+        runs = load_runs(path, build_id)
+        for run in runs:
+            if run in seen:
+                sys.exit(f"{seen[run]} and {path} are both build {run}")
+            if not build_id:
+                check_source(db, run, os.path.abspath(path))
+            seen[run] = path
+        loaded.append((path, runs))
+    for path, runs in loaded:
+        # Without a timestamp, runs are ordered by when their file was written
+        stamp = timestamp or os.path.getmtime(path)
+        for run, tests in runs.items():
+            ingest_run(
+                db, run, tests, os.path.abspath(path), stamp, bool(build_id)
+            )
+            print(f"{path}: {run}, {len(tests)} tests", file=sys.stderr)
+
+
+def last_results(db, name="", suite=None, result=None, limit=10):
+    """Return the last `limit` results of every test matching the filters.
+
+    Rows are (name, suite, build_id, timestamp, result, time), ordered by
+    test name and newest first.
+    """
+    # An "IS NULL OR" filter would keep the result index from being used
+    query = LAST_RESULTS.format(
+        result_filter="AND last.result = :result" if result else ""
+    )
+    params = {"name": f"%{name}%", "suite": suite, "result": result, "limit": limit}
+    return db.execute(query, params).fetchall()
+
+
+def print_results(rows):
+    current = None
+    for name, suite, build_id, timestamp, result, duration in rows:
+        if name != current:
+            print(f"\n{name}")
+            current = name
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+        print(f"  {build_id:<24} {when:<18}{result:<8}{duration:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Store results of many runs in SQLite and query them."
+    )
+    parser.add_argument(
+        "--db",
+        default="results.db",
+        help="SQLite database file. Default: %(default)s",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = commands.add_parser(
+        "ingest",
+        help="Load JUnit XML, junit2json or parse_log JSON and NDJSON files.",
+    )
+    ingest_parser.add_argument("files", nargs="+", help="Files to load.")
+    ingest_parser.add_argument(
+        "-b",
+        "--build-id",
+        help="Build ID of the run, for a single file. Default: from the file "
+        "contents or the Prow build directory in its path",
+    )
+    ingest_parser.add_argument(
+        "--timestamp",
+        type=float,
+        help="Start of the run, in seconds since the epoch. "
+        "Default: modification time of the file",
+    )
+    query_parser = commands.add_parser(
+        "query", help="Show the last results of tests, newest first."
+    )
+    query_parser.add_argument(
+        "name", nargs="?", default="", help="Part of the test name to match."
+    )
+    query_parser.add_argument("-s", "--suite", help="Only tests of this suite.")
+    query_parser.add_argument(
+        "-r",
+        "--result",
+        choices=["pass", "fail", "skip", "error"],
+        help="Only results of this kind.",
+    )
+    query_parser.add_argument(
+        "-n",
+        "--last",
+        type=int,
+        default=10,
+        help="Results per test. Default: %(default)s",
+    )
+    args = parser.parse_args()
+
+    db = connect(args.db)
+    if args.command == "ingest":
+        ingest(db, args.files, args.build_id, args.timestamp)
+    else:
+        print_results(
+            last_results(db, args.name, args.suite, args.result, args.last)
+        )
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
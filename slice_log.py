@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+"""Print the output of tests from a build log, without scanning the log.
+
+parse_log.py stores the byte offsets of every test in its results. Only
+those byte ranges of the log are read here, so showing a test of a log of
+hundreds of MB takes a single seek.
+"""
+
+import argparse
+import json
+import sys
+
+from ginkgo_log import color_code_pattern, read_slice
+
+
+def find_tests(results, names):
+    """Return (name, offsets) of the tests whose name contains one of names."""
+    return [
+        (name, result["offsets"])
+        for name, result in results.items()
+        if "offsets" in result and (not names or any(n in name for n in names))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Print the log output of tests parsed by parse_log.py."
+    )
+    parser.add_argument(
+        "names",
+        nargs="*",
+        help="Parts of the test names to print. Default: all tests",
+    )
+    parser.add_argument(
+        "-p", "--path", required=True, help="Build log the results come from."
+    )
+    parser.add_argument(
+        "-r", "--results", help="JSON written by parse_log.py for the log."
+    )
+    parser.add_argument(
+        "--offsets",
+        nargs=2,
+        type=int,
+        metavar=("START", "END"),
+        help="Print this byte range of the log instead.",
+    )
+    parser.add_argument(
+        "--no-color",
+        action="store_true",
+        help="Remove terminal color codes from the output.",
+    )
+    args = parser.parse_args()
+    if not args.results and not args.offsets:
+        parser.error("give --results or --offsets")
+
+    if args.offsets:
+        tests = [(None, args.offsets)]
+    else:
+        with open(args.results) as f:
+            tests = find_tests(json.load(f), args.names)
+        if not tests:
+            sys.exit("No test with offsets matches")
+    out = sys.stdout.buffer
+    for name, (start, end) in tests:
+        if name is not None:
+            out.write(f"===== {name} [{start}:{end}]\n".encode())
+        data = read_slice(args.path, start, end)
+        if args.no_color:
+            data = color_code_pattern.sub(b"", data)
+        out.write(data)
+    out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+"""Serve a directory the way the Prow artifact server does, for CI.
+
+Unlike http.server, Range requests are answered with 206. With --drop the
+first response for every file breaks off halfway, like a dropped
+connection, so clients have to resume the download. Requests are logged
+to stderr.
+"""
+
+import argparse
+import functools
+import http.server
+import os
+
+
+class Handler(http.server.SimpleHTTPRequestHandler):
+    # Break off the first response for a file, and the files that had theirs
+    drop = False
+    dropped = set()
+
+    def do_GET(self):
+        path = self.translate_path(self.path)
+        if os.path.isfile(path):
+            if self.headers.get("Range"):
+                return self.send_range(path, self.headers["Range"])
+            if self.drop and path not in self.dropped:
+                self.dropped.add(path)
+                return self.send_half(path)
+        return super().do_GET()
+
+    def send_range(self, path, header):
+        size = os.path.getsize(path)
+        start, _, end = header.split("=", 1)[1].partition("-")
+        if start:
+            start, end = int(start), int(end) if end else size - 1
+        else:
+            start, end = max(0, size - int(end)), size - 1
+        if start >= size:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        end = min(end, size - 1)
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end + 1 - start)
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header(
+            "Last-Modified", self.date_time_string(os.path.getmtime(path))
+        )
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_half(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data[:len(data) // 2])
+        self.close_connection = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("directory", help="Directory to serve.")
+    parser.add_argument(
+        "-p", "--port", type=int, default=8000, help="Default: %(default)s"
+    )
+    parser.add_argument(
+        "--drop",
+        action="store_true",
+        help="Break off the first response for every file halfway.",
+    )
+    args = parser.parse_args()
+    Handler.drop = args.drop
+    handler = functools.partial(Handler, directory=args.directory)
+    http.server.ThreadingHTTPServer(("", args.port), handler).serve_forever()
+
+
+if __name__ == "__main__":
+    main()